@@ -0,0 +1,206 @@
+import json
+from datetime import date
+from functools import partial
+from itertools import islice
+
+from flask import Blueprint, Response, abort, current_app, request, stream_with_context
+
+import arguments
+from cache import invalidate_shows
+from models import db
+from pagination import encode_cursor
+import queries
+
+
+#----------------------------------------------------------------------------#
+# JSON API, version 1.
+#----------------------------------------------------------------------------#
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+# number of serialized items joined into one chunk of a streamed response
+CHUNK_SIZE = 200
+
+# most shows accepted by one batch creation request
+MAX_BATCH_SIZE = 1000
+
+
+def _default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError('{!r} is not JSON serializable'.format(value))
+
+
+def _dumps(value):
+    return json.dumps(value, default=_default, separators=(',', ':'))
+
+
+def _json(value, status=200):
+    return Response(_dumps(value), status=status, mimetype='application/json')
+
+
+def _not_found():
+    return _json({'error': 'not found'}, 404)
+
+
+def _limit():
+    """The optional ?limit= of a list request, or None for every row."""
+    limit = request.args.get('limit', type=int)
+    return limit if limit is None or limit > 0 else None
+
+
+def _search_limit():
+    """The ?limit= of a search request, at most SEARCH_LIMIT."""
+    most = current_app.config['SEARCH_LIMIT']
+    return min(_limit() or most, most)
+
+
+def _genres():
+    """The ?genre= filters of a list or search request."""
+    return arguments.genre_args(request.args)
+
+
+def _time_arg(name):
+    """The optional ?from= or ?to= time of a request, which keeps the shows
+    starting at or after, or before, that time."""
+    try:
+        return arguments.time_arg(request.args, name)
+    except ValueError as error:
+        abort(_json({'error': str(error)}, 400))
+
+
+def _stream_list(iter_items):
+    """Stream `{"data": [...], "next_cursor": ...}` for a list endpoint.
+
+    Items are serialized as they are read from the database and sent in
+    chunks of CHUNK_SIZE, so memory use does not depend on the number of
+    rows. `next_cursor` is set when ?limit= cut the list short.
+    """
+    limit = _limit()
+    items = iter_items(
+        after=request.args.get('after'),
+        limit=limit + 1 if limit is not None else None
+    )
+
+    def generate():
+        yield '{"data":['
+        separator = ''
+        chunk = []
+        last_key = None
+        for sort_key, item in islice(items, limit):
+            chunk.append(_dumps(item))
+            last_key = sort_key
+            if len(chunk) == CHUNK_SIZE:
+                yield separator + ','.join(chunk)
+                separator = ','
+                chunk = []
+        if chunk:
+            yield separator + ','.join(chunk)
+
+        has_more = limit is not None and next(items, None) is not None
+        next_cursor = encode_cursor(last_key) if has_more else None
+        yield '],"next_cursor":' + _dumps(next_cursor) + '}'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+
+#  Venues
+#  ----------------------------------------------------------------
+
+@api.route('/venues')
+def list_venues():
+    return _stream_list(partial(queries.iter_venues, genres=_genres()))
+
+@api.route('/venues/search')
+def search_venues():
+    return _json(queries.search_venues(request.args.get('q', ''), _genres(), _search_limit()))
+
+@api.route('/venues/nearby')
+def nearby_venues():
+    """Venues within ?radius= km (NEARBY_RADIUS_KM by default) of ?lat=
+    and ?lng=, nearest first, at most ?limit= (20) of them."""
+    try:
+        latitude, longitude, radius = arguments.location_args(request.args, required=True)
+    except ValueError as error:
+        return _json({'error': str(error)}, 400)
+    return _json(queries.nearby_venues(latitude, longitude, radius, _limit() or 20))
+
+@api.route('/venues/<int:venue_id>')
+def show_venue(venue_id):
+    venue = queries.venue_detail(venue_id, _time_arg('from'), _time_arg('to'))
+    if venue is None:
+        return _not_found()
+    return _json(venue)
+
+
+#  Artists
+#  ----------------------------------------------------------------
+
+@api.route('/artists')
+def list_artists():
+    return _stream_list(partial(queries.iter_artists, genres=_genres()))
+
+@api.route('/artists/search')
+def search_artists():
+    return _json(queries.search_artists(request.args.get('q', ''), _genres(), _search_limit()))
+
+@api.route('/artists/<int:artist_id>')
+def show_artist(artist_id):
+    artist = queries.artist_detail(artist_id, _time_arg('from'), _time_arg('to'))
+    if artist is None:
+        return _not_found()
+    return _json(artist)
+
+
+#  Shows
+#  ----------------------------------------------------------------
+
+@api.route('/shows')
+def list_shows():
+    return _stream_list(partial(queries.iter_shows, start=_time_arg('from'), end=_time_arg('to')))
+
+@api.route('/shows', methods=['POST'])
+def create_show_batch():
+    """Create many shows at once.
+
+    Takes a JSON list of {"venue_id", "artist_id", "start_time"} objects,
+    start_time formatted like the show form ("2021-05-21 21:30:00"). Valid
+    shows are created even when others fail. Responds with the number of
+    created and failed shows and a result per show, in order, holding the
+    new show's id, venue_id and artist_id or the validation errors.
+    """
+    records = request.get_json(silent=True)
+    if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+        return _json({'error': 'expected a JSON list of show objects'}, 400)
+    if len(records) > MAX_BATCH_SIZE:
+        return _json({'error': 'at most {} shows per request'.format(MAX_BATCH_SIZE)}, 413)
+
+    # validation goes through the forms, imported on first use
+    from bulk_import import create_shows
+
+    try:
+        results = create_shows(records)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    created = [result for result in results if 'id' in result]
+    invalidate_shows({result['venue_id'] for result in created},
+                     {result['artist_id'] for result in created})
+    return _json({
+        'created': len(created),
+        'failed': len(results) - len(created),
+        'results': results
+    })
+
+@api.route('/shows/search')
+def search_shows():
+    return _json(queries.search_shows(request.args.get('q', ''), _search_limit()))
+
+@api.route('/shows/<int:show_id>')
+def show_show(show_id):
+    show = queries.show_detail(show_id)
+    if show is None:
+        return _not_found()
+    return _json(show)
@@ -2,61 +2,127 @@
 # Imports
 #----------------------------------------------------------------------------#
 
-import json
-import dateutil.parser
-import babel
+# Only what every worker needs to serve a page is imported here. Forms
+# (WTForms), Flask-Migrate, dateutil and Babel are imported by the views and
+# commands that use them, on first use, so that new workers start quickly;
+# see `python -m bench.startup`.
+import os
+import logging
+import click
+from datetime import timedelta
+from functools import lru_cache
 from flask import (
+  Blueprint,
   Flask, 
+  current_app,
+  g,
   render_template, 
   request, 
   Response, 
   flash, 
   redirect, 
   url_for,
-  jsonify
+  jsonify,
+  abort,
+  stream_with_context
 )
-from flask_moment import Moment
-
-import logging
-from logging import Formatter, FileHandler
-from flask_wtf import Form
-from forms import *
-from flask_migrate import Migrate
-from datetime import datetime
+from jinja2 import FileSystemBytecodeCache
 from models import db, Venue, Artist, Show   
+from conditional import conditional
+from cache import (
+  response_cache, fragment_cache, cached, init_cache,
+  invalidate_venue, invalidate_artist, invalidate_show
+)
+from counters import refresh_show_counts, refresh_started_shows
+from api import api
+from instrumentation import init_sql_instrumentation
+from pooling import init_db_pool, pool_stats
+import arguments
+import assets
+import export
+from queries import (
+  venue_areas,
+  venue_detail,
+  nearby_venues as nearby_venues_by_distance,
+  list_artists,
+  artist_detail,
+  list_shows,
+  venue_artist_ids,
+  artist_venue_ids,
+  venue_genre_facets,
+  artist_genre_facets,
+  venue_version,
+  venues_version,
+  artist_version,
+  artists_version,
+  shows_version,
+  search_venues as search_venues_by_name,
+  search_artists as search_artists_by_name
+)
 
 #----------------------------------------------------------------------------#
-# App Config.
+# Blueprints.
 #----------------------------------------------------------------------------#
 
-app = Flask(__name__)
-moment = Moment(app)
-app.config.from_object('config')
-db.init_app(app)
+# the app itself is built by create_app() at the end of this module
+main_bp = Blueprint('main', __name__, cli_group=None)
+venues_bp = Blueprint('venues', __name__)
+artists_bp = Blueprint('artists', __name__)
+shows_bp = Blueprint('shows', __name__)
 
-# DONE: connect to a local postgresql database
+#----------------------------------------------------------------------------#
+# Filters.
+#----------------------------------------------------------------------------#
 
-migrate = Migrate(app, db)
+DATETIME_FORMATS = {
+  'full': "EEEE MMMM, d, y 'at' h:mma",
+  'medium': "EE MM, dd, y h:mma"
+}
+
+@lru_cache(maxsize=None)
+def datetime_pattern(format, locale):
+  # compiled once per format and locale instead of on every call
+  import babel.dates
+  return babel.dates.parse_pattern(DATETIME_FORMATS.get(format, format)), babel.Locale.parse(locale)
+
+def format_datetime(value, format='medium', locale='en'):
+  # takes datetime objects as they come from the database; strings are
+  # still parsed for older callers
+  if isinstance(value, str):
+    import dateutil.parser
+    value = dateutil.parser.parse(value)
+  pattern, locale = datetime_pattern(format, locale)
+  return pattern.apply(value, locale)
 
 #----------------------------------------------------------------------------#
-# Filters.
+# Request arguments.
 #----------------------------------------------------------------------------#
 
-def format_datetime(value, format='medium'):
-  date = dateutil.parser.parse(value)
-  if format == 'full':
-      format="EEEE MMMM, d, y 'at' h:mma"
-  elif format == 'medium':
-      format="EE MM, dd, y h:mma"
-  return babel.dates.format_datetime(date, format, locale='en')
+def genre_args():
+  # the ?genre= filters of a listing, or of a search form, unknown names dropped
+  return arguments.genre_args(request.values)
+
+def location_args():
+  # the ?lat=&lng=&radius= (km) of a nearby search, None when no location
+  # is given, 400 when it is not a valid one
+  try:
+    return arguments.location_args(request.args)
+  except ValueError:
+    abort(400)
 
-app.jinja_env.filters['datetime'] = format_datetime
+def parse_time_arg(name):
+  # a ?from= or ?to= time, 400 when it cannot be parsed
+  try:
+    return arguments.time_arg(request.args, name)
+  except ValueError:
+    abort(400)
 
 #----------------------------------------------------------------------------#
 # Controllers.
 #----------------------------------------------------------------------------#
 
-@app.route('/')
+@main_bp.route('/')
+@cached
 def index():
   return render_template('pages/home.html')
 
@@ -64,124 +130,81 @@ def index():
 #  Venues
 #  ----------------------------------------------------------------
 
-@app.route('/venues')
+@venues_bp.route('/venues')
+@conditional(venues_version)
+@cached
 def venues():
   # DONE: replace with real venues data.
   #       num_shows should be aggregated based on number of upcoming shows per venue.
   
-  locations = db.session.query(Venue.city, Venue.state).distinct().all()
-
-  data = []
-  
-  for city, state in locations:
-    new_data = {}
-    new_data["city"] = city
-    new_data["state"] = state
-    new_data["venues"] = []
-    venues = Venue.query.filter_by(city=city, state=state).all()
-    for venue in venues:
-      venue_info = {}
-      venue_info['id'] = venue.id
-      venue_info['name'] = venue.name
-      venue_info['num_upcoming_shows'] = len(venue.shows)
-      new_data["venues"].append(venue_info)
-    data.append(new_data)
-
-  return render_template('pages/venues.html', areas=data);
-
-@app.route('/venues/search', methods=['POST'])
+  genres = genre_args()
+  page = venue_areas(
+    after=request.args.get('after'),
+    before=request.args.get('before'),
+    page_size=current_app.config['PAGE_SIZE'],
+    genres=genres
+  )
+
+  return render_template('pages/venues.html', areas=page.items, page=page,
+                         facets=venue_genre_facets(genres, g.get('version')));
+
+@venues_bp.route('/venues/search', methods=['POST'])
 def search_venues():
   # DONE: implement search on artists with partial string search. Ensure it is case-insensitive.
   # seach for Hop should return "The Musical Hop".
   # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
   
   search_term = request.form.get('search_term', '')
-  app.logger.info(search_term)
-
-  res = Venue.query.filter(Venue.name.ilike("%"+ search_term +"%")).all()
-  data = []
-  for venue in res:
-    entry = {}
-    entry['id'] = venue.id
-    entry['name'] = venue.name
-    upcomingshows = []
-    for show in venue.shows:
-      if show.start_time >= datetime.now():
-        upcomingshows.append(show)
-    entry["num_upcoming_shows"] = len(upcomingshows)
-    data.append(entry)
-  
-  response = {"count": len(data), "data": data}
+  current_app.logger.info(search_term)
+
+  response = search_venues_by_name(search_term, genre_args(),
+                                   limit=current_app.config['SEARCH_LIMIT'])
   return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
 
-@app.route('/venues/<int:venue_id>')
+@venues_bp.route('/venues/nearby')
+def nearby_venues():
+  # venues around ?lat=&lng=, within ?radius= km, nearest first; the
+  # page asks the browser for its location when none is given
+  location = location_args()
+  response = None
+  if location is not None:
+    latitude, longitude, radius = location
+    response = nearby_venues_by_distance(latitude, longitude, radius,
+                                         limit=current_app.config['PAGE_SIZE'])
+  return render_template('pages/nearby_venues.html', results=response, location=location)
+
+@venues_bp.route('/venues/<int:venue_id>')
+@conditional(venue_version)
+@cached
 def show_venue(venue_id):
   # shows the venue page with the given venue_id
   # DONE: replace with real venue data from the venues table, using venue_id
 
-  data = []
-  venues = Venue.query.all()
-  
-  for venue in venues:
-    entry = {}
-    entry['id'] = venue.id
-    entry['name'] = venue.name
-    entry['genres'] = venue.genres 
-    entry['address'] = venue.address
-    entry['city'] = venue.city
-    entry['state'] = venue.state
-    entry['phone'] = venue.phone
-    entry['website'] = venue.website_link
-    entry['facebook_link'] = venue.facebook_link
-    entry['seeking_talent'] = venue.seeking_talent
-    entry['seeking_description'] = venue.seeking_description
-    entry['image_link'] = venue.image_link
-
-    past_shows = []
-    upcoming_shows = []
-    for show in venue.shows:
-      if show.start_time <= datetime.now():
-        past_shows.append({
-          'artist_id': show.artist_id,
-          'artist_name': show.showartist.name,
-          'artist_image_link': show.showartist.image_link,
-          'start_time': str(show.start_time)
-        })
-      else:
-        upcoming_shows.append({
-          'artist_id': show.artist_id,
-          'artist_name': show.showartist.name,
-          'artist_image_link': show.showartist.image_link,
-          'start_time': str(show.start_time)
-        })
-      
-    entry['past_shows'] = past_shows
-    entry['upcoming_shows'] = upcoming_shows
-    entry['past_shows_count'] = len(past_shows)
-    entry['upcoming_shows_count'] = len(upcoming_shows)
-
-    data.append(entry)
-
-  currvenuedata = list(filter(lambda d: d['id'] == venue_id, data))[0]
-  return render_template('pages/show_venue.html', venue=currvenuedata)
+  data = venue_detail(venue_id, start=parse_time_arg('from'), end=parse_time_arg('to'))
+  if data is None:
+    abort(404)
+
+  return render_template('pages/show_venue.html', venue=data)
 
 #  Create Venue
 #  ----------------------------------------------------------------
 
-@app.route('/venues/create', methods=['GET'])
+@venues_bp.route('/venues/create', methods=['GET'])
 def create_venue_form():
+  from forms import VenueForm
   form = VenueForm()
   return render_template('forms/new_venue.html', form=form)
 
-@app.route('/venues/create', methods=['POST'])
+@venues_bp.route('/venues/create', methods=['POST'])
 def create_venue_submission():
+  from forms import VenueForm
   # DONE: insert form data as a new Venue record in the db, instead
   # DONE: modify data to be the data object returned from db insertion
   error = False
   try:
     form = VenueForm(request.form, meta={'csrf': False})
     if not form.validate():
-      app.logger.info(form.errors)
+      current_app.logger.info(form.errors)
       error = True
 
     else:  
@@ -196,14 +219,17 @@ def create_venue_submission():
         facebook_link = form.facebook_link.data,
         website_link = form.website_link.data,
         seeking_talent = form.seeking_talent.data,
-        seeking_description = form.seeking_description.data
+        seeking_description = form.seeking_description.data,
+        latitude = form.latitude.data,
+        longitude = form.longitude.data
       )
       db.session.add(newVenue)
       db.session.commit()
       newVenueName = newVenue.name
+      response_cache.invalidate('venues.venues')
 
   except Exception as err:
-    app.logger.error('err = %s', err)
+    current_app.logger.error('err = %s', err)
     error = True
     db.session.rollback()
 
@@ -221,7 +247,7 @@ def create_venue_submission():
     flash('Venue ' + newVenueName + ' was successfully listed!')
     return render_template('pages/home.html')
 
-@app.route('/venues/<venue_id>', methods=['DELETE'])
+@venues_bp.route('/venues/<venue_id>', methods=['DELETE'])
 def delete_venue(venue_id):
   # DONE: Complete this endpoint for taking a venue_id, and using
   # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
@@ -231,10 +257,15 @@ def delete_venue(venue_id):
   error = False
   todelete = Venue.query.get(venue_id)
   try:
+    artist_ids = venue_artist_ids(venue_id)
     db.session.delete(todelete)
+    db.session.flush()
+    refresh_show_counts(venue_ids=[], artist_ids=artist_ids)
+    Artist.touch(artist_ids)
     db.session.commit()
+    invalidate_venue(int(venue_id), artist_ids)
   except:
-    app.logger.error('Delete Venue Error')
+    current_app.logger.error('Delete Venue Error')
     error = True
     db.session.rollback()
   finally:
@@ -251,113 +282,51 @@ def delete_venue(venue_id):
 
 #  Artists
 #  ----------------------------------------------------------------
-@app.route('/artists')
+@artists_bp.route('/artists')
+@conditional(artists_version)
+@cached
 def artists():
   # DONE: replace with real data returned from querying the database
-  artists = Artist.query.all()
-  data = []
-  for artist in artists:
-    entry = {}
-    entry["id"] = artist.id
-    entry["name"] = artist.name
-    data.append(entry)
-
-  return render_template('pages/artists.html', artists=data)
-
-@app.route('/artists/search', methods=['POST'])
+  genres = genre_args()
+  page = list_artists(
+    after=request.args.get('after'),
+    before=request.args.get('before'),
+    page_size=current_app.config['PAGE_SIZE'],
+    genres=genres
+  )
+
+  return render_template('pages/artists.html', artists=page.items, page=page,
+                         facets=artist_genre_facets(genres, g.get('version')))
+
+@artists_bp.route('/artists/search', methods=['POST'])
 def search_artists():
   # DONE: implement search on artists with partial string search. Ensure it is case-insensitive.
   # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
   # search for "band" should return "The Wild Sax Band".
   search_term = request.form.get('search_term', '')
 
-  res = Artist.query.filter(Artist.name.ilike("%"+ search_term +"%")).all()
-  data = []
-  for artist in res:
-    entry = {}
-    entry['id'] = artist.id
-    entry['name'] = artist.name
-    upcomingshows = []
-    for show in artist.shows:
-      if show.start_time >= datetime.now():
-        upcomingshows.append(show)
-    entry["num_upcoming_shows"] = len(upcomingshows)
-    data.append(entry)
-  
-  response = {"count": len(data), "data": data}
+  response = search_artists_by_name(search_term, genre_args(),
+                                    limit=current_app.config['SEARCH_LIMIT'])
   return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''))
 
-@app.route('/artists/<int:artist_id>')
+@artists_bp.route('/artists/<int:artist_id>')
+@conditional(artist_version)
+@cached
 def show_artist(artist_id):
   # shows the venue(artist) page with the given venue_id
   # DONE: replace with real venue(artist) data from the venues(artists) table, using venue(artist)_id
   
-  def showinfo(show):
-    info = {}
-    venue_id = show.venue_id 
-    if venue_id is None: return None
-    app.logger.info('venue id for {%s} is {%s}', artist_id, venue_id)
-    venue = Venue.query.get(venue_id)
-    info['venue_id'] = venue.id
-    info['venue_name'] = venue.name
-    info['venue_image_link'] = venue.image_link
-    info['start_time'] = str(show.start_time)
-    return info
+  data = artist_detail(artist_id, start=parse_time_arg('from'), end=parse_time_arg('to'))
+  if data is None:
+    abort(404)
 
-  try:
-    data = []
-    artists = Artist.query.all()
-
-    for artist in artists:
-      entry = {}
-      entry['id'] = artist.id
-      entry['name'] = artist.name
-      entry['genres'] = artist.genres
-      entry['city'] = artist.city
-      entry['state'] = artist.state
-      entry['phone'] = artist.phone
-      entry['website'] = artist.website_link
-      entry['facebook_link'] = artist.facebook_link
-      entry['seeking_venue'] = artist.seeking_venue
-      entry['seeking_description'] = artist.seeking_description
-      entry['image_link'] = artist.image_link
-
-      past_shows = []
-      upcoming_shows = []
-      for show in artist.shows:
-        if show.venue_id:
-          if show.start_time <= datetime.now():
-            past_shows.append({
-              'venue_id': show.venue_id,
-              'venue_name': show.showvenue.name,
-              'venue_image_link': show.showvenue.image_link,
-              'start_time': str(show.start_time)
-            })
-          else:
-            upcoming_shows.append({
-              'venue_id': show.venue_id,
-              'venue_name': show.showvenue.name,
-              'venue_image_link': show.showvenue.image_link,
-              'start_time': str(show.start_time)
-            })
-
-      entry['past_shows'] = past_shows
-      entry['upcoming_shows'] = upcoming_shows
-      entry['past_shows_count'] = len(past_shows)
-      entry['upcoming_shows_count'] = len(upcoming_shows)
-
-      data.append(entry)
-  
-    currartistdata = list(filter(lambda d: d['id'] == artist_id, data))[0]
-    return render_template('pages/show_artist.html', artist=currartistdata)
-  
-  except Exception as e:
-    app.logger.error(e)
+  return render_template('pages/show_artist.html', artist=data)
 
 #  Update
 #  ----------------------------------------------------------------
-@app.route('/artists/<int:artist_id>/edit', methods=['GET'])
+@artists_bp.route('/artists/<int:artist_id>/edit', methods=['GET'])
 def edit_artist(artist_id):
+  from forms import ArtistForm
   form = ArtistForm()
   artist = Artist.query.get(artist_id)
   form.name.data = artist.name
@@ -376,8 +345,9 @@ def edit_artist(artist_id):
   # DONE: populate form with fields from artist with ID <artist_id>
   return render_template('forms/edit_artist.html', form=form, artist=artist)
 
-@app.route('/artists/<int:artist_id>/edit', methods=['POST'])
+@artists_bp.route('/artists/<int:artist_id>/edit', methods=['POST'])
 def edit_artist_submission(artist_id):
+  from forms import ArtistForm
   # DONE: take values from the form submitted, and update existing
   # artist record with ID <artist_id> using the new attributes
 
@@ -385,7 +355,7 @@ def edit_artist_submission(artist_id):
   try:
     form = ArtistForm(request.form, meta={'csrf': False})
     if not form.validate():
-      app.logger.info(form.errors)
+      current_app.logger.info(form.errors)
       error = True
 
     else:
@@ -406,11 +376,15 @@ def edit_artist_submission(artist_id):
       artist.seeking_venue = form.seeking_venue.data
       artist.seeking_description = form.seeking_description.data
 
+      # the artist's name and image are shown on the pages of its venues
+      venue_ids = artist_venue_ids(artist_id)
+      Venue.touch(venue_ids)
       db.session.commit()
       artist_name = artist.name
+      invalidate_artist(artist_id, venue_ids)
 
   except Exception as err:
-    app.logger.error('err = %s', err)
+    current_app.logger.error('err = %s', err)
     error = True
     db.session.rollback()
 
@@ -419,14 +393,15 @@ def edit_artist_submission(artist_id):
 
   if error:
     flash('An error occurred. Artist ' + form.name.data + ' could not be updated.')
-    return redirect(url_for("edit_artist", artist_id=artist_id))
+    return redirect(url_for("artists.edit_artist", artist_id=artist_id))
   else:
     # on successful db insert, flash success
     flash('Artist ' + artist_name + ' was successfully updated!')
-    return redirect(url_for('show_artist', artist_id=artist_id))
+    return redirect(url_for('artists.show_artist', artist_id=artist_id))
 
-@app.route('/venues/<int:venue_id>/edit', methods=['GET'])
+@venues_bp.route('/venues/<int:venue_id>/edit', methods=['GET'])
 def edit_venue(venue_id):
+  from forms import VenueForm
   form = VenueForm()
   venue = Venue.query.get(venue_id)
   form.name.data = venue.name
@@ -440,21 +415,24 @@ def edit_venue(venue_id):
   form.seeking_talent.data = venue.seeking_talent
   form.seeking_description.data = venue.seeking_description
   form.image_link.data = venue.image_link
+  form.latitude.data = venue.latitude
+  form.longitude.data = venue.longitude
 
   venue = {"id": venue_id, "name": venue.name}
 
   # DONE: populate form with values from venue with ID <venue_id>
   return render_template('forms/edit_venue.html', form=form, venue=venue)
 
-@app.route('/venues/<int:venue_id>/edit', methods=['POST'])
+@venues_bp.route('/venues/<int:venue_id>/edit', methods=['POST'])
 def edit_venue_submission(venue_id):
+  from forms import VenueForm
   # DONE: take values from the form submitted, and update existing
   # venue record with ID <venue_id> using the new attributes
   error = False
   try:
     form = VenueForm(request.form, meta={'csrf': False})
     if not form.validate():
-      app.logger.info(form.errors)
+      current_app.logger.info(form.errors)
       error = True
 
     else:
@@ -471,12 +449,17 @@ def edit_venue_submission(venue_id):
       venue.website_link = form.website_link.data
       venue.seeking_talent = form.seeking_talent.data
       venue.seeking_description = form.seeking_description.data
+      venue.latitude = form.latitude.data
+      venue.longitude = form.longitude.data
 
+      artist_ids = venue_artist_ids(venue_id)
+      Artist.touch(artist_ids)
       db.session.commit()
       venue_name = venue.name
+      invalidate_venue(venue_id, artist_ids)
 
   except Exception as err:
-    app.logger.error('err = %s', err)
+    current_app.logger.error('err = %s', err)
     error = True
     db.session.rollback()
   finally:
@@ -485,23 +468,25 @@ def edit_venue_submission(venue_id):
 
   if error:
     flash('An error occurred. Venue ' + form.name.data + ' could not be updated.')
-    return redirect(url_for("edit_venue", venue_id=venue_id))
+    return redirect(url_for("venues.edit_venue", venue_id=venue_id))
   else:
     # on successful db insert, flash success
     flash('Venue ' + venue_name + ' was successfully updated!')
-    return redirect(url_for('show_venue', venue_id=venue_id))
+    return redirect(url_for('venues.show_venue', venue_id=venue_id))
 
 
 #  Create Artist
 #  ----------------------------------------------------------------
 
-@app.route('/artists/create', methods=['GET'])
+@artists_bp.route('/artists/create', methods=['GET'])
 def create_artist_form():
+  from forms import ArtistForm
   form = ArtistForm()
   return render_template('forms/new_artist.html', form=form)
 
-@app.route('/artists/create', methods=['POST'])
+@artists_bp.route('/artists/create', methods=['POST'])
 def create_artist_submission():
+  from forms import ArtistForm
   # called upon submitting the new artist listing form
   # DONE: insert form data as a new Venue record in the db, instead
   # DONE: modify data to be the data object returned from db insertion
@@ -511,7 +496,7 @@ def create_artist_submission():
     form = ArtistForm(request.form, meta={'csrf': False})
 
     if not form.validate():
-      app.logger.info(form.errors)
+      current_app.logger.info(form.errors)
       error = True
 
     else:
@@ -530,9 +515,10 @@ def create_artist_submission():
       db.session.add(newArtist)
       db.session.commit()
       newArtistName = newArtist.name
+      response_cache.invalidate('artists.artists')
 
   except Exception as err:
-    app.logger.error('err = %s', err)
+    current_app.logger.error('err = %s', err)
     error = True
     db.session.rollback()
   finally:
@@ -552,36 +538,52 @@ def create_artist_submission():
 #  Shows
 #  ----------------------------------------------------------------
 
-@app.route('/shows')
+@shows_bp.route('/shows')
+@conditional(shows_version)
+@cached
 def shows():
   # displays list of shows at /shows
   # DONE: replace with real venues data.
   #       num_shows should be aggregated based on number of upcoming shows per venue.
-  shows = Show.query.all()
-  data = []
-  for show in shows:
-    entry = {}
-    venue = show.venue
-    artist = show.artist
-    if not venue or not artist: continue
-    entry["venue_id"] = venue.id
-    entry["venue_name"] = venue.name
-    entry["artist_id"] = artist.id
-    entry["artist_name"] = artist.name
-    entry["artist_image_link"] = artist.image_link
-    entry["start_time"] = str(show.start_time)
-    data.append(entry)
-  
-  return render_template('pages/shows.html', shows=data)
-
-@app.route('/shows/create')
+  # ?from= / ?to= keep the shows starting in that window, by start time
+  page = list_shows(
+    after=request.args.get('after'),
+    before=request.args.get('before'),
+    page_size=current_app.config['PAGE_SIZE'],
+    start=parse_time_arg('from'),
+    end=parse_time_arg('to')
+  )
+
+  return render_template('pages/shows.html', shows=page.items, page=page)
+
+@shows_bp.route('/shows/export')
+def export_shows():
+  # streams every show, optionally ?from=&to= start times and ?venue_id=,
+  # as ?format=csv (default) or ndjson
+  file_format = request.args.get('format', 'csv')
+  if file_format not in export.FORMATS:
+    abort(400)
+  rows = export.iter_shows(
+    start=parse_time_arg('from'),
+    end=parse_time_arg('to'),
+    venue_id=request.args.get('venue_id', type=int)
+  )
+  return Response(
+    stream_with_context(export.export_chunks(file_format, rows)),
+    mimetype=export.FORMATS[file_format],
+    headers={'Content-Disposition': 'attachment; filename=shows.' + file_format}
+  )
+
+@shows_bp.route('/shows/create')
 def create_shows():
   # renders form. do not touch.
+  from forms import ShowForm
   form = ShowForm()
   return render_template('forms/new_show.html', form=form)
 
-@app.route('/shows/create', methods=['POST'])
+@shows_bp.route('/shows/create', methods=['POST'])
 def create_show_submission():
+  from forms import ShowForm
   # called to create new shows in the db, upon submitting new show listing form
   # DONE: insert form data as a new Show record in the db, instead
   error = False
@@ -589,7 +591,7 @@ def create_show_submission():
     form = ShowForm(request.form, meta={'csrf': False})
 
     if not form.validate():
-      app.logger.info(form.errors)
+      current_app.logger.info(form.errors)
       error = True
       raise Exception ("invalid input")
 
@@ -610,10 +612,13 @@ def create_show_submission():
         start_time = form.start_time.data
       )
       db.session.add(newShow)
+      db.session.flush()
+      refresh_show_counts(venue_ids=[venue_id], artist_ids=[artist_id])
       db.session.commit()
+      invalidate_show(venue_id, artist_id)
 
   except Exception as err:
-    app.logger.error('err = %s', err)
+    current_app.logger.error('err = %s', err)
     error = True
     db.session.rollback()
   finally:
@@ -630,36 +635,152 @@ def create_show_submission():
       flash('Show at ' + str(form.start_time.data) + ' was successfully listed!')
       return render_template('pages/home.html')
 
-@app.errorhandler(404)
+@main_bp.route('/cache/stats')
+def cache_stats():
+  return jsonify(responses=response_cache.stats(), fragments=fragment_cache.stats())
+
+@main_bp.route('/db/stats')
+def db_stats():
+  return jsonify(pool_stats(db.engine))
+
+@main_bp.app_errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
 
-@app.errorhandler(500)
+@main_bp.app_errorhandler(500)
 def server_error(error):
     return render_template('errors/500.html'), 500
 
 
-if not app.debug:
-    file_handler = FileHandler('error.log')
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+@main_bp.cli.command('refresh-show-counts')
+@click.option('--since', type=int, default=None,
+              help='Only refresh venues and artists with shows that started '
+                   'in the last SINCE minutes. Refreshes every row by default.')
+def refresh_show_counts_command(since):
+  """Recompute stored upcoming/past show counts. Run this from cron."""
+  if since is None:
+    updated = refresh_show_counts()
+  else:
+    updated = refresh_started_shows(timedelta(minutes=since))
+  db.session.commit()
+  click.echo('Updated show counts of {} venues and artists.'.format(updated))
+
+
+@main_bp.cli.command('import-data')
+@click.argument('kind', type=click.Choice(['artists', 'shows', 'venues']))
+@click.argument('file', type=click.File('r'))
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'ndjson']),
+              help='File format. Defaults to ndjson for .ndjson/.jsonl files, csv otherwise.')
+@click.option('--batch-size', type=int, default=5000, show_default=True,
+              help='Records validated, copied and committed together.')
+def import_data_command(kind, file, file_format, batch_size):
+  """Bulk load venues, artists or shows from a CSV or NDJSON file."""
+  import bulk_import
+  if file_format is None:
+    file_format = 'ndjson' if file.name.endswith(('.ndjson', '.jsonl')) else 'csv'
+
+  def on_reject(line, errors):
+    click.echo('line {}: rejected {}'.format(line, errors), err=True)
+
+  def on_batch(imported, rejected, elapsed):
+    click.echo('{} imported, {} rejected, {:.0f} rows/s'.format(
+      imported, rejected, (imported + rejected) / elapsed if elapsed else 0))
+
+  records = bulk_import.read_records(file, file_format)
+  imported, rejected, elapsed = bulk_import.import_records(
+    kind, records, batch_size, on_batch=on_batch, on_reject=on_reject)
+  click.echo('Imported {} {} in {:.1f}s ({:.0f} rows/s), rejected {}.'.format(
+    imported, kind, elapsed, imported / elapsed if elapsed else 0, rejected))
+
+
+@main_bp.cli.command('export-shows')
+@click.option('--output', '-o', type=click.File('w'), default='-',
+              help='File to write to. Defaults to stdout.')
+@click.option('--format', 'file_format', type=click.Choice(sorted(export.FORMATS)),
+              default='csv', show_default=True)
+@click.option('--from', 'start', type=click.DateTime(), default=None,
+              help='Only shows starting at or after this time.')
+@click.option('--to', 'end', type=click.DateTime(), default=None,
+              help='Only shows starting before this time.')
+@click.option('--venue-id', type=int, default=None, help='Only shows at this venue.')
+def export_shows_command(output, file_format, start, end, venue_id):
+  """Stream shows with their venue and artist names as CSV or NDJSON."""
+  rows = export.iter_shows(start=start, end=end, venue_id=venue_id)
+  for chunk in export.export_chunks(file_format, rows):
+    output.write(chunk)
+
+
+@main_bp.cli.command('build-assets')
+def build_assets_command():
+  """Bundle, minify, fingerprint and gzip static files into static/dist."""
+  manifest = assets.build(current_app.static_folder, echo=click.echo)
+  click.echo('Built {} files. Restart the server to use them.'.format(len(manifest)))
+
+
+#----------------------------------------------------------------------------#
+# App Factory.
+#----------------------------------------------------------------------------#
+
+def create_app(config='config'):
+  """Build the app. `FLASK_APP=app` makes the flask command call this."""
+  app = Flask(__name__)
+  app.config.from_object(config)
+  if not app.debug and not app.config.get('SECRET_KEY'):
+    raise RuntimeError('SECRET_KEY must be set when debug mode is off')
+
+  # compiled templates are kept on disk and shared by every worker, so a
+  # new worker loads them instead of compiling each one on first render
+  cache_dir = app.config.get('JINJA_BYTECODE_CACHE_DIR')
+  if cache_dir:
+    os.makedirs(cache_dir, exist_ok=True)
+    app.jinja_options = dict(app.jinja_options, bytecode_cache=FileSystemBytecodeCache(cache_dir))
+  app.jinja_env.filters['datetime'] = format_datetime
+
+  # DONE: connect to a local postgresql database
+  db.init_app(app)
+  init_db_pool(app)
+  init_cache(app)
+  assets.init_assets(app)
+  init_sql_instrumentation(app)
+
+  app.register_blueprint(main_bp)
+  app.register_blueprint(venues_bp)
+  app.register_blueprint(artists_bp)
+  app.register_blueprint(shows_bp)
+  app.register_blueprint(api)
+
+  # `flask db` needs Flask-Migrate, the workers serving requests do not
+  if click.get_current_context(silent=True) is not None:
+    from flask_migrate import Migrate
+    Migrate(app, db)
+
+  if not app.debug:
+    file_handler = logging.FileHandler('error.log')
     file_handler.setFormatter(
-        Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
+        logging.Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
     )
     app.logger.setLevel(logging.INFO)
     file_handler.setLevel(logging.INFO)
     app.logger.addHandler(file_handler)
     app.logger.info('errors')
 
+  return app
+
 #----------------------------------------------------------------------------#
 # Launch.
 #----------------------------------------------------------------------------#
 
 # Default port:
 if __name__ == '__main__':
-    app.run()
+    create_app().run()
 
 # Or specify port manually:
 '''
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port)
+    create_app().run(host='0.0.0.0', port=port)
 '''
@@ -0,0 +1,62 @@
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+
+from enums import GENRE_NAMES
+
+
+#----------------------------------------------------------------------------#
+# Request arguments shared by the pages and the JSON API.
+#----------------------------------------------------------------------------#
+
+# Each parser takes the arguments of a request and raises ValueError, with a
+# message naming the argument, for one it cannot use. app.py answers that
+# with its 400 page and api.py with a JSON error.
+
+
+def time_arg(args, name):
+    """The optional ?from= or ?to= time of a request, or None.
+
+    Shows are kept from `from` up to, not including, `to`. A `to` that is
+    a date alone, as the date inputs of the pages send, includes that day:
+    it stands for midnight at the end of it.
+    """
+    value = args.get(name)
+    if not value:
+        return None
+    if name == 'to':
+        try:
+            day = date.fromisoformat(value)
+        except ValueError:
+            pass
+        else:
+            return datetime.combine(day + timedelta(days=1), datetime.min.time())
+    # imported on first use, like the rest of the app (see app.py)
+    import dateutil.parser
+    try:
+        return dateutil.parser.parse(value)
+    except (ValueError, OverflowError):
+        raise ValueError('invalid {} time'.format(name))
+
+
+def genre_args(args):
+    """The ?genre= filters of a listing or search request, unknown names
+    dropped."""
+    return [genre for genre in args.getlist('genre') if genre in GENRE_NAMES]
+
+
+def location_args(args, required=False):
+    """The ?lat=, ?lng= and ?radius= (km, NEARBY_RADIUS_KM by default) of a
+    nearby search, or None when neither lat nor lng is given and the
+    location is not `required`."""
+    if not required and 'lat' not in args and 'lng' not in args:
+        return None
+    latitude = args.get('lat', type=float)
+    longitude = args.get('lng', type=float)
+    radius = args.get('radius', current_app.config['NEARBY_RADIUS_KM'], type=float)
+    if latitude is None or longitude is None:
+        raise ValueError('lat and lng are required')
+    if not -90 <= latitude <= 90 or not -180 <= longitude <= 180 \
+            or not 0 < radius <= current_app.config['NEARBY_MAX_RADIUS_KM']:
+        raise ValueError('invalid lat, lng or radius')
+    return latitude, longitude, radius
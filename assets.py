@@ -0,0 +1,262 @@
+import gzip
+import hashlib
+import importlib
+import io
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+
+from flask import current_app, request, send_from_directory, url_for
+
+
+#----------------------------------------------------------------------------#
+# Static asset build.
+#----------------------------------------------------------------------------#
+
+# built files are written below static/, next to their sources, and served
+# with far-future cache headers since their names change with their content
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+
+# bundle name: source files, relative to static/, in load order
+BUNDLES = {
+    'css/app.css': [
+        'css/bootstrap.min.css',
+        'css/layout.main.css',
+        'css/main.css',
+        'css/main.responsive.css',
+        'css/main.quickfix.css',
+    ],
+    # loaded in <head>, before the page is parsed
+    'js/head.js': [
+        'js/libs/modernizr-2.8.2.min.js',
+        'js/libs/moment.min.js',
+        'js/script.js',
+    ],
+    # deferred, after jQuery
+    'js/app.js': [
+        'js/libs/bootstrap-3.1.1.min.js',
+        'js/plugins.js',
+    ],
+}
+
+# image: widths of the resized variants offered through srcset
+IMAGES = {
+    'img/front-splash.jpg': (480, 800, 1200),
+}
+JPEG_QUALITY = 80
+
+# files also written gzipped, when that makes them smaller
+COMPRESSIBLE = ('.css', '.js', '.svg', '.eot', '.ttf', '.json')
+
+_CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+
+def _optional(module):
+    """The optional build dependency `module`, or None when it is not
+    installed. Imported on first use, as only `flask build-assets` needs
+    them."""
+    try:
+        return importlib.import_module(module)
+    except ImportError:
+        return None
+
+
+def _minify(name, text):
+    rcssmin, rjsmin = _optional('rcssmin'), _optional('rjsmin')
+    if name.endswith('.css') and rcssmin is not None:
+        return rcssmin.cssmin(text)
+    if name.endswith('.js') and rjsmin is not None:
+        return rjsmin.jsmin(text)
+    return text
+
+
+def _variant_name(name, width):
+    root, ext = posixpath.splitext(name)
+    return '{}-{}w{}'.format(root, width, ext)
+
+
+class _Build(object):
+
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        self.dist = os.path.join(static_folder, DIST)
+        self.manifest = {}
+
+    def source(self, name):
+        with open(os.path.join(self.static_folder, name), 'rb') as source:
+            return source.read()
+
+    def emit(self, name, data):
+        """Write `data` as `name` with a content hash in its file name, and
+        a gzipped copy where it helps. Returns the path written, relative
+        to DIST."""
+        if name in self.manifest:
+            return self.manifest[name]
+        root, ext = posixpath.splitext(name)
+        built = '{}.{}{}'.format(root, hashlib.sha256(data).hexdigest()[:12], ext)
+        path = os.path.join(self.dist, built)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as output:
+            output.write(data)
+        if ext in COMPRESSIBLE:
+            buffer = io.BytesIO()
+            # mtime=0 keeps the compressed bytes identical between builds
+            with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=9, mtime=0) as compressed:
+                compressed.write(data)
+            if buffer.tell() < len(data):
+                with open(path + '.gz', 'wb') as output:
+                    output.write(buffer.getvalue())
+        self.manifest[name] = built
+        return built
+
+    def rewrite_urls(self, text, source, bundle):
+        """Point the url()s of a stylesheet at built copies of the files
+        they reference, relative to where the bundle is written."""
+        def replace(match):
+            url = match.group(2)
+            if re.match(r'^(?:[a-z]+:|/|#)', url):
+                return match.group(0)
+            path, suffix = re.match(r'^([^?#]*)(.*)$', url).groups()
+            name = posixpath.normpath(posixpath.join(posixpath.dirname(source), path))
+            if os.path.isfile(os.path.join(self.static_folder, name)):
+                target = self.emit(name, self.source(name))
+                start = posixpath.dirname(bundle)
+            else:
+                # keep pointing at the original location
+                target = name
+                start = posixpath.join(DIST, posixpath.dirname(bundle))
+            return 'url("{}{}")'.format(posixpath.relpath(target, start), suffix)
+        return _CSS_URL.sub(replace, text)
+
+    def bundle(self, name, sources):
+        parts = []
+        for source in sources:
+            text = self.source(source).decode('utf-8')
+            if name.endswith('.css'):
+                text = self.rewrite_urls(text, source, name)
+            parts.append(_minify(name, text))
+        # a script may end without a semicolon
+        separator = '\n' if name.endswith('.css') else ';\n'
+        return self.emit(name, separator.join(parts).encode('utf-8'))
+
+    def image(self, name, widths):
+        data = self.source(name)
+        Image = _optional('PIL.Image')
+        if Image is None:
+            return [self.emit(name, data)]
+        original = Image.open(io.BytesIO(data))
+        built = []
+        for width in sorted(widths) + [original.width]:
+            if width > original.width:
+                continue
+            image = original
+            if width < original.width:
+                height = round(original.height * width / original.width)
+                image = original.resize((width, height), Image.LANCZOS)
+            buffer = io.BytesIO()
+            image.convert('RGB').save(buffer, 'JPEG', quality=JPEG_QUALITY,
+                                      optimize=True, progressive=True)
+            encoded = buffer.getvalue()
+            if width == original.width:
+                built.append(self.emit(name, min(encoded, data, key=len)))
+            else:
+                built.append(self.emit(_variant_name(name, width), encoded))
+        return built
+
+
+def build(static_folder, echo=print):
+    """Build every bundle and image into static/dist and write the
+    manifest mapping their names to the built files."""
+    if _optional('rcssmin') is None or _optional('rjsmin') is None:
+        echo('rcssmin/rjsmin not installed (see requirements-build.txt): '
+             'bundles are concatenated, not minified.')
+    if _optional('PIL.Image') is None:
+        echo('Pillow not installed (see requirements-build.txt): '
+             'images are copied without resized variants.')
+
+    builder = _Build(static_folder)
+    shutil.rmtree(builder.dist, ignore_errors=True)
+    for name, sources in BUNDLES.items():
+        echo('{} <- {} files'.format(builder.bundle(name, sources), len(sources)))
+    for name, widths in IMAGES.items():
+        for built in builder.image(name, widths):
+            echo(built)
+
+    with open(os.path.join(builder.dist, MANIFEST), 'w') as manifest:
+        json.dump(builder.manifest, manifest, indent=2, sort_keys=True)
+    return builder.manifest
+
+
+#----------------------------------------------------------------------------#
+# Serving and template helpers.
+#----------------------------------------------------------------------------#
+
+def _manifest():
+    return current_app.extensions.get('assets_manifest') or {}
+
+
+def asset_url(name):
+    """URL of a static file, fingerprinted when it has been built."""
+    built = _manifest().get(name)
+    if built is None:
+        return url_for('static', filename=name)
+    return url_for('dist', filename=built)
+
+
+def asset_urls(name):
+    """URLs to load for a bundle: the built bundle, or its sources one by
+    one when assets have not been built."""
+    if name in _manifest():
+        return [asset_url(name)]
+    return [url_for('static', filename=source) for source in BUNDLES[name]]
+
+
+def asset_srcset(name):
+    """A srcset attribute value listing the built variants of an image,
+    empty when there are none."""
+    manifest = _manifest()
+    return ', '.join(
+        '{} {}w'.format(url_for('dist', filename=manifest[_variant_name(name, width)]), width)
+        for width in IMAGES.get(name, ())
+        if _variant_name(name, width) in manifest
+    )
+
+
+def send_dist(filename):
+    dist = os.path.join(current_app.static_folder, DIST)
+    if request.accept_encodings['gzip'] and os.path.isfile(os.path.join(dist, filename + '.gz')):
+        response = send_from_directory(dist, filename + '.gz',
+                                       mimetype=mimetypes.guess_type(filename)[0])
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = send_from_directory(dist, filename)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = 365 * 24 * 3600
+    response.cache_control.immutable = True
+    return response
+
+
+def init_assets(app):
+    """Serve static/dist and make the asset helpers available to templates.
+
+    The manifest is read once at startup, so rebuild and restart after
+    changing static files, or set USE_BUILT_ASSETS off to load the sources.
+    """
+    manifest = None
+    path = os.path.join(app.static_folder, DIST, MANIFEST)
+    if app.config.get('USE_BUILT_ASSETS', True) and os.path.isfile(path):
+        with open(path) as source:
+            manifest = json.load(source)
+    app.extensions['assets_manifest'] = manifest
+    app.add_url_rule('/static/{}/<path:filename>'.format(DIST), 'dist', send_dist)
+    app.jinja_env.globals.update(
+        asset_url=asset_url,
+        asset_urls=asset_urls,
+        asset_srcset=asset_srcset
+    )
@@ -0,0 +1,31 @@
+"""Compare two result files written by `python -m bench.load --output`.
+
+Usage:
+
+    python -m bench.compare before.json after.json
+"""
+import json
+import sys
+
+
+def main():
+    if len(sys.argv) != 3:
+        sys.exit(__doc__)
+    with open(sys.argv[1]) as before_file, open(sys.argv[2]) as after_file:
+        before = {result['route']: result for result in json.load(before_file)['results']}
+        after = {result['route']: result for result in json.load(after_file)['results']}
+
+    print('{:<26} {:>17} {:>17} {:>19}'.format('route', 'p50 ms', 'p95 ms', 'req/s'))
+    for route in before:
+        if route not in after:
+            continue
+        old, new = before[route], after[route]
+        cells = []
+        for key in ('p50_ms', 'p95_ms', 'throughput_rps'):
+            change = (new[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+            cells.append('{:>8.1f} {:>+7.0f}%'.format(new[key], change))
+        print('{:<26} {} {} {}'.format(route, cells[0], cells[1], ' ' + cells[2]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Time rendering the /shows template with the `datetime` filter.
+
+Renders pages/shows.html for a page of synthetic shows twice: as the
+views used to, with start times passed as strings and the filter parsing
+them and its Babel pattern on every call, and with the current filter on
+native datetimes. No database is needed.
+
+Usage:
+
+    python -m bench.datetime_filter [--shows 10000] [--repeat 5]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import babel.dates
+import dateutil.parser
+from flask import render_template
+
+from app import create_app, format_datetime, DATETIME_FORMATS
+from pagination import Page
+
+
+def legacy_format_datetime(value, format='medium'):
+    date = dateutil.parser.parse(value)
+    return babel.dates.format_datetime(date, DATETIME_FORMATS.get(format, format), locale='en')
+
+
+def make_shows(count):
+    start = datetime(2021, 1, 1, 20, 0)
+    return [{
+        'id': number,
+        'venue_id': number % 500,
+        'venue_name': 'Venue {}'.format(number % 500),
+        'artist_id': number % 1000,
+        'artist_name': 'Artist {}'.format(number % 1000),
+        'artist_image_link': 'https://example.com/{}.jpg'.format(number % 1000),
+        'start_time': start + timedelta(hours=7 * number, minutes=number % 60)
+    } for number in range(count)]
+
+
+def best_of(repeat, render):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        render()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--shows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    shows = make_shows(args.shows)
+    legacy_shows = [dict(show, start_time=str(show['start_time'])) for show in shows]
+    page = Page(items=shows, next_cursor=None, prev_cursor=None)
+    app = create_app()
+    # rows would otherwise come from the fragment cache after the first run
+    app.config['FRAGMENT_CACHE_ENABLED'] = False
+
+    with app.test_request_context('/shows'):
+        def render(filter, items):
+            app.jinja_env.filters['datetime'] = filter
+            return lambda: render_template('pages/shows.html', shows=items, page=page)
+
+        try:
+            legacy = best_of(args.repeat, render(legacy_format_datetime, legacy_shows))
+            current = best_of(args.repeat, render(format_datetime, shows))
+        finally:
+            app.jinja_env.filters['datetime'] = format_datetime
+
+    print('{} shows, best of {}'.format(args.shows, args.repeat))
+    print('  {:<28}{:8.1f} ms'.format('strings, parsed every call', legacy * 1000))
+    print('  {:<28}{:8.1f} ms ({:.1f}x)'.format('datetimes, cached pattern', current * 1000,
+                                               legacy / current))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+"""Drive every route of a running Fyyur server and report latency per route.
+
+Usage (from the repository root, with the app served on localhost:5000):
+
+    python -m bench.load --requests 200 --concurrency 8 --output before.json
+    python -m bench.load --requests 200 --concurrency 8 --output after.json
+    python -m bench.compare before.json after.json
+
+Routes are benchmarked one after the other so each one's numbers are not
+mixed with another's. Venue, artist and show ids are sampled through the JSON
+API, so any server with data can be targeted.
+"""
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+from bench.seed import COORDINATES
+
+
+def _near_a_city(rng):
+    latitude, longitude = rng.choice(list(COORDINATES.values()))
+    return 'lat={:.4f}&lng={:.4f}'.format(latitude + rng.gauss(0, 0.05),
+                                          longitude + rng.gauss(0, 0.05))
+
+
+def bench_routes(include_writes=False):
+    """(name, method, path factory, form factory) for each route of app.py
+    and the JSON API, except the stats pages and, unless `include_writes`,
+    the ones that write. Edits, deletes and batch show creation are left
+    out either way.
+
+    Path and form factories take the random generator and the sampled ids.
+    Nearby searches land around the centres of the cities bench.seed uses.
+    """
+    routes = [
+        ('index', 'GET', lambda rng, ids: '/', None),
+        ('venues', 'GET', lambda rng, ids: '/venues', None),
+        ('search_venues', 'POST', lambda rng, ids: '/venues/search',
+         lambda rng, ids: {'search_term': rng.choice(['hall', 'blue', 'room', 'club'])}),
+        ('nearby_venues', 'GET', lambda rng, ids: '/venues/nearby?' + _near_a_city(rng), None),
+        ('show_venue', 'GET', lambda rng, ids: '/venues/{}'.format(rng.choice(ids['venues'])), None),
+        ('create_venue_form', 'GET', lambda rng, ids: '/venues/create', None),
+        ('edit_venue', 'GET', lambda rng, ids: '/venues/{}/edit'.format(rng.choice(ids['venues'])), None),
+        ('artists', 'GET', lambda rng, ids: '/artists', None),
+        ('search_artists', 'POST', lambda rng, ids: '/artists/search',
+         lambda rng, ids: {'search_term': rng.choice(['the', 'wolves', 'blue', 'kings'])}),
+        ('show_artist', 'GET', lambda rng, ids: '/artists/{}'.format(rng.choice(ids['artists'])), None),
+        ('create_artist_form', 'GET', lambda rng, ids: '/artists/create', None),
+        ('edit_artist', 'GET', lambda rng, ids: '/artists/{}/edit'.format(rng.choice(ids['artists'])), None),
+        ('shows', 'GET', lambda rng, ids: '/shows', None),
+        ('export_shows', 'GET',
+         lambda rng, ids: '/shows/export?venue_id={}'.format(rng.choice(ids['venues'])), None),
+        ('create_shows', 'GET', lambda rng, ids: '/shows/create', None),
+        ('api.list_venues', 'GET', lambda rng, ids: '/api/v1/venues?limit=100', None),
+        ('api.search_venues', 'GET',
+         lambda rng, ids: '/api/v1/venues/search?q=' + rng.choice(['hall', 'blue', 'room', 'club']), None),
+        ('api.nearby_venues', 'GET', lambda rng, ids: '/api/v1/venues/nearby?' + _near_a_city(rng), None),
+        ('api.show_venue', 'GET', lambda rng, ids: '/api/v1/venues/{}'.format(rng.choice(ids['venues'])), None),
+        ('api.list_artists', 'GET', lambda rng, ids: '/api/v1/artists?limit=100', None),
+        ('api.search_artists', 'GET',
+         lambda rng, ids: '/api/v1/artists/search?q=' + rng.choice(['the', 'wolves', 'blue', 'kings']), None),
+        ('api.show_artist', 'GET', lambda rng, ids: '/api/v1/artists/{}'.format(rng.choice(ids['artists'])), None),
+        ('api.list_shows', 'GET', lambda rng, ids: '/api/v1/shows?limit=100', None),
+        ('api.search_shows', 'GET',
+         lambda rng, ids: '/api/v1/shows/search?q=' + rng.choice(['hall', 'blue', 'the', 'kings']), None),
+        ('api.show_show', 'GET', lambda rng, ids: '/api/v1/shows/{}'.format(rng.choice(ids['shows'])), None),
+    ]
+    if include_writes:
+        routes += [
+            ('create_venue_submission', 'POST', lambda rng, ids: '/venues/create',
+             lambda rng, ids: {'name': 'Bench Venue {}'.format(rng.random()), 'city': 'Austin',
+                               'state': 'TX', 'address': '1 Main St', 'phone': '512-555-0100',
+                               'genres': 'Jazz'}),
+            ('create_artist_submission', 'POST', lambda rng, ids: '/artists/create',
+             lambda rng, ids: {'name': 'Bench Artist {}'.format(rng.random()), 'city': 'Austin',
+                               'state': 'TX', 'phone': '512-555-0100', 'genres': 'Jazz'}),
+            ('create_show_submission', 'POST', lambda rng, ids: '/shows/create',
+             lambda rng, ids: {'artist_id': rng.choice(ids['artists']),
+                               'venue_id': rng.choice(ids['venues']),
+                               'start_time': '2030-01-01 20:00:00'}),
+        ]
+    return routes
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+class Client(object):
+    """One keep-alive HTTP connection per thread."""
+
+    def __init__(self, base_url, timeout):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def request(self, method, path, form=None):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self.local.connection = connection
+        body = urlencode(form) if form is not None else None
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'} if form is not None else {}
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            return response.status
+        except (http.client.HTTPException, OSError):
+            connection.close()
+            self.local.connection = None
+            raise
+
+
+def sample_ids(client, count=500):
+    ids = {}
+    for kind in ('venues', 'artists', 'shows'):
+        connection = http.client.HTTPConnection(client.host, client.port, timeout=client.timeout)
+        connection.request('GET', '/api/v1/{}?limit={}'.format(kind, count))
+        data = json.loads(connection.getresponse().read())
+        connection.close()
+        ids[kind] = [item['id'] for item in data['data']] or [1]
+    return ids
+
+
+def run_route(client, route, ids, requests, concurrency, seed):
+    name, method, path_for, form_for = route
+    rng = random.Random(seed)
+    plan = [(path_for(rng, ids), form_for(rng, ids) if form_for else None)
+            for _ in range(requests)]
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def one(request):
+        path, form = request
+        started = time.perf_counter()
+        try:
+            status = client.request(method, path, form)
+            failed = status >= 500
+        except (http.client.HTTPException, OSError):
+            failed = True
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            if failed:
+                errors[0] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, plan))
+    wall = time.perf_counter() - started
+
+    return {
+        'route': name,
+        'requests': requests,
+        'errors': errors[0],
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'throughput_rps': requests / wall if wall else None,
+    }
+
+
+def print_table(results):
+    print('{:<26} {:>6} {:>9} {:>9} {:>9} {:>10}'.format(
+        'route', 'errors', 'p50 ms', 'p95 ms', 'p99 ms', 'req/s'))
+    for result in results:
+        print('{route:<26} {errors:>6} {p50_ms:>9.1f} {p95_ms:>9.1f} {p99_ms:>9.1f} '
+              '{throughput_rps:>10.1f}'.format(**result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--requests', type=int, default=200, help='requests per route')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--warmup', type=int, default=10, help='untimed requests per route')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--routes', help='comma separated route names to run (default: all)')
+    parser.add_argument('--include-writes', action='store_true',
+                        help='also run the create routes, which insert rows')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    args = parser.parse_args()
+
+    client = Client(args.base_url, args.timeout)
+    ids = sample_ids(client)
+    routes = bench_routes(args.include_writes)
+    if args.routes:
+        wanted = set(args.routes.split(','))
+        routes = [route for route in routes if route[0] in wanted]
+
+    results = []
+    for route in routes:
+        if args.warmup:
+            run_route(client, route, ids, args.warmup, args.concurrency, args.seed + 1)
+        results.append(run_route(client, route, ids, args.requests, args.concurrency, args.seed))
+    print_table(results)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({
+                'base_url': args.base_url,
+                'requests': args.requests,
+                'concurrency': args.concurrency,
+                'results': results
+            }, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Time the /venues/nearby query against the configured database.
+
+Searches around points a little off randomly picked located venues, so
+the searches land where venues are, as "near me" searches do, and reports
+the median, p95 and slowest time per radius, through the geohash index
+and by computing the distance of every located venue instead.
+
+Usage (from the repository root, after seeding e.g. 100,000 venues):
+
+    python -m bench.seed --venues 100000 --artists 20000 --shows 300000 --truncate
+    python -m bench.nearby [--searches 200] [--radius 2 10 50]
+"""
+import argparse
+import random
+import statistics
+import time
+from unittest import mock
+
+from bench.load import percentile
+
+
+def time_searches(nearby_venues, points, radius):
+    timings = []
+    found = 0
+    for latitude, longitude in points:
+        started = time.perf_counter()
+        found += nearby_venues(latitude, longitude, radius)['count']
+        timings.append(time.perf_counter() - started)
+    return timings, found / len(points)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--searches', type=int, default=200, help='searches per radius')
+    parser.add_argument('--radius', type=float, nargs='+', default=[2, 10, 50],
+                        help='search radii in km')
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    from app import create_app
+    from models import db, Venue
+    import geo
+    import queries
+
+    rng = random.Random(args.seed)
+    with create_app().app_context():
+        located = db.session.query(Venue.latitude, Venue.longitude) \
+                            .filter(Venue.geohash.isnot(None)).all()
+        if not located:
+            raise SystemExit('No venue has coordinates; seed some with bench.seed.')
+        points = [(latitude + rng.gauss(0, 0.02), longitude + rng.gauss(0, 0.02))
+                  for latitude, longitude in rng.choices(located, k=args.searches)]
+        print('{} located venues, {} searches per radius, nearest {}'.format(
+            len(located), args.searches, args.limit))
+        print('{:<18}{:>10}{:>10}{:>10}{:>10}{:>10}'.format(
+            'search', 'radius km', 'found', 'p50 ms', 'p95 ms', 'max ms'))
+
+        def search(latitude, longitude, radius):
+            return queries.nearby_venues(latitude, longitude, radius, args.limit)
+
+        for label, covering in (('geohash index', geo.covering),
+                                ('every venue', lambda *point: None)):
+            with mock.patch('geo.covering', covering):
+                for radius in args.radius:
+                    time_searches(search, points[:10], radius)
+                    timings, found = time_searches(search, points, radius)
+                    print('{:<18}{:>10g}{:>10.1f}{:>10.2f}{:>10.2f}{:>10.2f}'.format(
+                        label, radius, found, statistics.median(timings) * 1000,
+                        percentile(timings, 0.95) * 1000, max(timings) * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+"""Seed the configured database with synthetic venues, artists and shows.
+
+Usage (from the repository root):
+
+    python -m bench.seed --venues 10000 --artists 20000 --shows 200000 --truncate
+
+Cities, genres and show popularity follow skewed distributions so that
+listing pages, searches and detail pages see realistic group sizes.
+"""
+import argparse
+import csv
+import io
+import random
+import time
+from datetime import datetime, timedelta
+
+import geo
+from enums import Genre, State
+
+
+# (city, state, weight): larger cities get more venues and artists
+CITIES = [
+    ('New York', 'NY', 30), ('Los Angeles', 'CA', 25), ('Chicago', 'IL', 18),
+    ('Houston', 'TX', 14), ('Phoenix', 'AZ', 10), ('Philadelphia', 'PA', 10),
+    ('San Antonio', 'TX', 8), ('San Diego', 'CA', 8), ('Dallas', 'TX', 8),
+    ('San Jose', 'CA', 6), ('Austin', 'TX', 9), ('Jacksonville', 'FL', 5),
+    ('Columbus', 'OH', 5), ('Charlotte', 'NC', 5), ('San Francisco', 'CA', 12),
+    ('Indianapolis', 'IN', 4), ('Seattle', 'WA', 9), ('Denver', 'CO', 7),
+    ('Washington', 'DC', 7), ('Boston', 'MA', 8), ('Nashville', 'TN', 11),
+    ('Detroit', 'MI', 5), ('Portland', 'OR', 6), ('Las Vegas', 'NV', 7),
+    ('Memphis', 'TN', 4), ('Louisville', 'KY', 3), ('Baltimore', 'MD', 4),
+    ('Milwaukee', 'WI', 3), ('Albuquerque', 'NM', 2), ('Atlanta', 'GA', 8),
+    ('Kansas City', 'MO', 3), ('Miami', 'FL', 7), ('Minneapolis', 'MN', 4),
+    ('New Orleans', 'LA', 6), ('Salt Lake City', 'UT', 2), ('Birmingham', 'AL', 2),
+    ('Anchorage', 'AK', 1), ('Honolulu', 'HI', 1), ('Burlington', 'VT', 1),
+    ('Boise', 'ID', 1),
+]
+
+# (latitude, longitude) of each city's centre; venues are spread around it
+COORDINATES = {
+    'New York': (40.713, -74.006), 'Los Angeles': (34.052, -118.244),
+    'Chicago': (41.878, -87.630), 'Houston': (29.760, -95.370),
+    'Phoenix': (33.448, -112.074), 'Philadelphia': (39.953, -75.165),
+    'San Antonio': (29.424, -98.494), 'San Diego': (32.716, -117.161),
+    'Dallas': (32.777, -96.797), 'San Jose': (37.338, -121.886),
+    'Austin': (30.267, -97.743), 'Jacksonville': (30.332, -81.656),
+    'Columbus': (39.961, -82.999), 'Charlotte': (35.227, -80.843),
+    'San Francisco': (37.775, -122.419), 'Indianapolis': (39.768, -86.158),
+    'Seattle': (47.606, -122.332), 'Denver': (39.739, -104.990),
+    'Washington': (38.907, -77.037), 'Boston': (42.360, -71.059),
+    'Nashville': (36.163, -86.781), 'Detroit': (42.331, -83.046),
+    'Portland': (45.515, -122.679), 'Las Vegas': (36.170, -115.140),
+    'Memphis': (35.150, -90.049), 'Louisville': (38.253, -85.759),
+    'Baltimore': (39.290, -76.612), 'Milwaukee': (43.039, -87.906),
+    'Albuquerque': (35.084, -106.650), 'Atlanta': (33.749, -84.388),
+    'Kansas City': (39.100, -94.579), 'Miami': (25.762, -80.192),
+    'Minneapolis': (44.978, -93.265), 'New Orleans': (29.951, -90.072),
+    'Salt Lake City': (40.761, -111.891), 'Birmingham': (33.519, -86.810),
+    'Anchorage': (61.218, -149.900), 'Honolulu': (21.307, -157.858),
+    'Burlington': (44.476, -73.212), 'Boise': (43.615, -116.202),
+}
+# share of venues seeded without coordinates
+UNLOCATED = 0.1
+
+# relative popularity of each genre, keyed by enum member
+GENRE_WEIGHTS = {
+    Genre.Rock_n_Roll: 14, Genre.Pop: 12, Genre.Hip_Hop: 11, Genre.Jazz: 8,
+    Genre.Alternative: 8, Genre.Electronic: 8, Genre.Country: 7, Genre.RnB: 6,
+    Genre.Folk: 5, Genre.Blues: 4, Genre.Punk: 4, Genre.Soul: 4,
+    Genre.Heavy_Metal: 4, Genre.Funk: 3, Genre.Reggae: 3, Genre.Classical: 3,
+    Genre.Instrumental: 2, Genre.Musical_Theatre: 2, Genre.Other: 1,
+}
+
+ADJECTIVES = ['Blue', 'Velvet', 'Golden', 'Electric', 'Midnight', 'Wild',
+              'Crimson', 'Silver', 'Lucky', 'Rusty', 'Neon', 'Broken', 'Howling',
+              'Paper', 'Hollow', 'Little', 'Northern', 'Savage', 'Quiet', 'Cosmic']
+NOUNS = ['Room', 'Hall', 'Tavern', 'Lounge', 'Garden', 'Cellar', 'Barn',
+         'Theatre', 'Club', 'Warehouse', 'Saloon', 'Cafe', 'Ballroom', 'Den']
+BAND_NOUNS = ['Wolves', 'Petals', 'Machines', 'Rivers', 'Saints', 'Ghosts',
+              'Echoes', 'Foxes', 'Comets', 'Strangers', 'Kings', 'Lanterns',
+              'Sparrows', 'Rebels', 'Tigers', 'Dreamers']
+
+
+def _valid_states():
+    states = {state.value for state in State}
+    return [(city, state, weight) for city, state, weight in CITIES if state in states]
+
+
+def _genres(rng):
+    members = list(GENRE_WEIGHTS)
+    weights = [GENRE_WEIGHTS[member] for member in members]
+    picked = set(rng.choices(members, weights, k=rng.randint(1, 3)))
+    # stored the same way the forms store them: the enum member names
+    return [member.name for member in picked]
+
+
+def _phone(rng):
+    return '{}-{}-{}'.format(rng.randint(200, 999), rng.randint(200, 999), rng.randint(1000, 9999))
+
+
+def _location(rng, city):
+    """Coordinates a few km around the city centre and their geohash, or
+    no location at all."""
+    if rng.random() < UNLOCATED:
+        return None, None, None
+    latitude, longitude = COORDINATES[city]
+    latitude += rng.gauss(0, 0.08)
+    longitude += rng.gauss(0, 0.1)
+    return latitude, longitude, geo.encode(latitude, longitude)
+
+
+def _array(values):
+    """Postgres array literal for COPY ... CSV."""
+    return '{' + ','.join('"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+                          for value in values) + '}'
+
+
+def _zipf_choices(rng, population, k, skew=1.1):
+    """Pick `k` items, favouring the start of `population` (a few very busy
+    venues and artists, a long tail of quiet ones)."""
+    weights = [1.0 / (rank ** skew) for rank in range(1, len(population) + 1)]
+    return rng.choices(population, weights, k=k)
+
+
+def _copy(cursor, table, columns, rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(
+        'COPY {} ({}) FROM STDIN WITH (FORMAT csv)'.format(table, ', '.join(columns)),
+        buffer
+    )
+
+
+def seed(venues, artists, shows, past_days=3 * 365, future_days=180,
+         seed_value=0, truncate=False, batch_size=50000):
+    from app import create_app
+    from models import db
+    from counters import refresh_show_counts
+
+    rng = random.Random(seed_value)
+    cities = _valid_states()
+    city_weights = [weight for _, _, weight in cities]
+
+    with create_app().app_context():
+        connection = db.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            if truncate:
+                cursor.execute('TRUNCATE shows, venues, artists RESTART IDENTITY')
+
+            started = time.monotonic()
+            rows = []
+            for number in range(venues):
+                city, state, _ = rng.choices(cities, city_weights)[0]
+                rows.append((
+                    '{} {} {}'.format(rng.choice(ADJECTIVES), rng.choice(NOUNS), number),
+                    city, state,
+                    '{} {} St'.format(rng.randint(1, 9999), rng.choice(ADJECTIVES)),
+                    _phone(rng),
+                    'https://images.example.com/venues/{}.jpg'.format(number),
+                    _array(_genres(rng)),
+                    rng.random() < 0.3,
+                ) + _location(rng, city))
+            _copy(cursor, 'venues', ['name', 'city', 'state', 'address', 'phone',
+                                     'image_link', 'genres', 'seeking_talent',
+                                     'latitude', 'longitude', 'geohash'], rows)
+
+            rows = []
+            for number in range(artists):
+                city, state, _ = rng.choices(cities, city_weights)[0]
+                rows.append((
+                    'The {} {} {}'.format(rng.choice(ADJECTIVES), rng.choice(BAND_NOUNS), number),
+                    city, state,
+                    _phone(rng),
+                    'https://images.example.com/artists/{}.jpg'.format(number),
+                    _array(_genres(rng)),
+                    rng.random() < 0.4,
+                ))
+            _copy(cursor, 'artists', ['name', 'city', 'state', 'phone',
+                                      'image_link', 'genres', 'seeking_venue'], rows)
+
+            cursor.execute('SELECT id FROM venues ORDER BY id')
+            venue_ids = [row[0] for row in cursor.fetchall()]
+            cursor.execute('SELECT id FROM artists ORDER BY id')
+            artist_ids = [row[0] for row in cursor.fetchall()]
+            rng.shuffle(venue_ids)
+            rng.shuffle(artist_ids)
+
+            start = datetime.now() - timedelta(days=past_days)
+            span = (past_days + future_days) * 24 * 3600
+            remaining = shows
+            while remaining > 0:
+                count = min(batch_size, remaining)
+                rows = zip(
+                    _zipf_choices(rng, venue_ids, count, skew=0.8),
+                    _zipf_choices(rng, artist_ids, count, skew=0.9),
+                    (start + timedelta(seconds=rng.randrange(span)) for _ in range(count))
+                )
+                _copy(cursor, 'shows', ['venue_id', 'artist_id', 'start_time'], rows)
+                remaining -= count
+            connection.commit()
+        finally:
+            connection.close()
+
+        refresh_show_counts()
+        db.session.commit()
+        # VACUUM, outside a transaction, also marks the pages all-visible,
+        # which the nearby search's index-only scans rely on; autovacuum
+        # would get there too, later
+        connection = db.engine.raw_connection()
+        try:
+            connection.set_isolation_level(0)
+            cursor = connection.cursor()
+            for table in ('venues', 'artists', 'shows'):
+                cursor.execute('VACUUM ANALYZE {}'.format(table))
+        finally:
+            connection.close()
+
+    return time.monotonic() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--venues', type=int, default=1000)
+    parser.add_argument('--artists', type=int, default=2000)
+    parser.add_argument('--shows', type=int, default=20000)
+    parser.add_argument('--past-days', type=int, default=3 * 365,
+                        help='spread shows this far into the past')
+    parser.add_argument('--future-days', type=int, default=180,
+                        help='and this far into the future')
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+    parser.add_argument('--truncate', action='store_true',
+                        help='empty the venues, artists and shows tables first')
+    args = parser.parse_args()
+
+    elapsed = seed(args.venues, args.artists, args.shows, args.past_days,
+                   args.future_days, args.seed, args.truncate)
+    print('Seeded {} venues, {} artists and {} shows in {:.1f}s'.format(
+        args.venues, args.artists, args.shows, elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Compare a B-tree and a BRIN index on shows.start_time for time windows.
+
+Copies the shows table into a temporary table in start_time order, the
+physical layout of an append-mostly table whose shows are listed roughly
+as they come up, then times the queries behind the /shows date filters
+with no index, a B-tree on (start_time, id) and a BRIN on start_time:
+the first page of a window ordered by start_time, and counting a window.
+The shows table itself is not changed.
+
+Usage (from the repository root, against a seeded database):
+
+    python -m bench.show_index [--repeat 20] [--page-size 20]
+"""
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta
+
+
+INDEXES = [
+    ('none', None),
+    ('btree (start_time, id)', 'CREATE INDEX ON bench_shows (start_time, id)'),
+    ('brin (start_time)', 'CREATE INDEX ON bench_shows USING brin (start_time)'),
+]
+
+PAGE = ('SELECT id, venue_id, artist_id, start_time FROM bench_shows '
+        'WHERE start_time >= %s AND start_time < %s ORDER BY start_time, id LIMIT %s')
+COUNT = 'SELECT count(*) FROM bench_shows WHERE start_time >= %s AND start_time < %s'
+
+
+def windows(cursor):
+    """(name, start, end) of a weekend, a month and a year in the middle
+    of the shows' time span."""
+    cursor.execute('SELECT min(start_time), max(start_time) FROM bench_shows')
+    first, last = cursor.fetchone()
+    middle = first + (last - first) / 2
+    friday = datetime(middle.year, middle.month, middle.day) + timedelta(days=(4 - middle.weekday()) % 7)
+    return [
+        ('weekend', friday + timedelta(hours=18), friday + timedelta(days=3)),
+        ('month', datetime(middle.year, middle.month, 1), datetime(middle.year, middle.month, 1) + timedelta(days=31)),
+        ('year', datetime(middle.year, 1, 1), datetime(middle.year + 1, 1, 1)),
+    ]
+
+
+def median_ms(cursor, repeat, statement, parameters):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cursor.execute(statement, parameters)
+        cursor.fetchall()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--page-size', type=int, default=20)
+    args = parser.parse_args()
+
+    from app import create_app
+    from models import db
+
+    with create_app().app_context():
+        connection = db.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute('CREATE TEMPORARY TABLE bench_shows AS '
+                           'SELECT * FROM shows ORDER BY start_time')
+            cursor.execute('SELECT count(*) FROM bench_shows')
+            print('{} shows, median of {} runs, ms'.format(cursor.fetchone()[0], args.repeat))
+            spans = windows(cursor)
+
+            header = '{:<24}{:>10}'.format('index', 'size kB')
+            for name, _, _ in spans:
+                header += '{:>14}{:>10}'.format(name + ' page', 'count')
+            print(header)
+
+            for label, create in INDEXES:
+                cursor.execute("SELECT indexrelid::regclass::text FROM pg_index "
+                               "WHERE indrelid = 'bench_shows'::regclass")
+                for index, in cursor.fetchall():
+                    cursor.execute('DROP INDEX {}'.format(index))
+                size = 0
+                if create:
+                    cursor.execute(create)
+                    cursor.execute("SELECT sum(pg_relation_size(indexrelid)) FROM pg_index "
+                                   "WHERE indrelid = 'bench_shows'::regclass")
+                    size = cursor.fetchone()[0] // 1024
+                cursor.execute('ANALYZE bench_shows')
+
+                line = '{:<24}{:>10}'.format(label, size)
+                for _, start, end in spans:
+                    page = median_ms(cursor, args.repeat, PAGE, (start, end, args.page_size + 1))
+                    count = median_ms(cursor, args.repeat, COUNT, (start, end))
+                    line += '{:>14.2f}{:>10.2f}'.format(page, count)
+                print(line)
+        finally:
+            connection.rollback()
+            connection.close()
+
+
+if __name__ == '__main__':
+    main()
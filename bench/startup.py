@@ -0,0 +1,110 @@
+"""Time how fast a new worker process gets ready to serve.
+
+Reports where `import app` spends its time, from `python -X importtime`,
+and the time from spawning a fresh interpreter to the response of its
+first request, with the Jinja bytecode cache off and warm. Needs the
+configured database for the first request, unless --path is a page that
+does not query it, such as /.
+
+Usage (from the repository root):
+
+    python -m bench.startup [--path /venues] [--repeat 5] [--top 15] [--output startup.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+
+# run in the child process: build the app and serve one request
+FIRST_REQUEST = '''
+import sys, time
+try:
+    from app import create_app
+    app = create_app()
+except ImportError:
+    # checkouts from before the app factory
+    from app import app
+response = app.test_client().get(sys.argv[2])
+print(time.time() - float(sys.argv[1]), response.status_code)
+'''
+
+
+def import_times():
+    """(module, self us, cumulative us, depth) for every module imported
+    by `import app`, in import order."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                            stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), int(own), int(cumulative), depth))
+    return modules
+
+
+def first_request(path, cache_dir):
+    env = dict(os.environ, JINJA_BYTECODE_CACHE_DIR=cache_dir)
+    result = subprocess.run([sys.executable, '-c', FIRST_REQUEST, repr(time.time()), path],
+                            env=env, stdout=subprocess.PIPE, universal_newlines=True, check=True)
+    elapsed, status = result.stdout.split()[-2:]
+    if status != '200':
+        raise SystemExit('{} answered {}'.format(path, status))
+    return float(elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--path', default='/venues', help='Page requested first.')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15,
+                        help='Number of top-level packages listed.')
+    parser.add_argument('--output', help='Also write the results to this JSON file.')
+    args = parser.parse_args()
+
+    modules = import_times()
+    total = next(cumulative for name, _, cumulative, depth in modules
+                 if name == 'app' and depth == 0)
+    packages = defaultdict(int)
+    for name, own, _, _ in modules:
+        packages[name.split('.')[0]] += own
+
+    print('import app: {:.1f} ms, {} modules'.format(total / 1000, len(modules)))
+    print('  {:<28}{:>10}'.format('package (all submodules)', 'self ms'))
+    top = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]
+    for name, own in top:
+        print('  {:<28}{:10.1f}'.format(name, own / 1000))
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # one run fills the bytecode cache for the warm runs
+        first_request(args.path, cache_dir)
+        readiness = {
+            'no bytecode cache': [first_request(args.path, '') for _ in range(args.repeat)],
+            'warm bytecode cache': [first_request(args.path, cache_dir)
+                                    for _ in range(args.repeat)],
+        }
+
+    print('spawn to first {} response, median of {}'.format(args.path, args.repeat))
+    for name, timings in readiness.items():
+        print('  {:<28}{:10.1f} ms'.format(name, statistics.median(timings) * 1000))
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({
+                'import_ms': total / 1000,
+                'modules': len(modules),
+                'packages_ms': {name: own / 1000 for name, own in top},
+                'first_request_ms': {name: statistics.median(timings) * 1000
+                                     for name, timings in readiness.items()},
+            }, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
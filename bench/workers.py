@@ -0,0 +1,112 @@
+"""Compare gunicorn's sync, gthread and gevent workers on /venues and /shows.
+
+Starts `gunicorn wsgi:app` once per worker class, with the same number of
+worker processes, drives the routes with bench.load and stops it again.
+The response and fragment caches are off unless --with-cache is given, so
+every request reaches the database.
+
+Usage (from the repository root, against a seeded local database):
+
+    python -m bench.workers [--workers 2] [--threads 8] [--concurrency 32] [--requests 1000]
+"""
+import argparse
+import http.client
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from bench.load import Client, bench_routes, run_route, sample_ids
+
+
+WORKER_CLASSES = ('sync', 'gthread', 'gevent')
+ROUTES = ('venues', 'shows')
+
+
+def start_server(worker_class, args):
+    env = dict(os.environ,
+               WSGI_WORKER_CLASS=worker_class,
+               WEB_CONCURRENCY=str(args.workers),
+               WSGI_THREADS=str(args.threads),
+               WSGI_WORKER_CONNECTIONS=str(args.connections),
+               BIND='127.0.0.1:{}'.format(args.port))
+    # wsgi.py turns debug mode off, which needs a key; one for every worker
+    env.setdefault('SECRET_KEY', 'bench-workers')
+    if not args.with_cache:
+        env.update(RESPONSE_CACHE_ENABLED='0', FRAGMENT_CACHE_ENABLED='0')
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', 'wsgi:app'], env=env,
+                              stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', args.port, timeout=5)
+            connection.request('GET', '/')
+            connection.getresponse().read()
+            connection.close()
+            return server
+        except OSError:
+            if server.poll() is not None:
+                raise SystemExit('gunicorn with {} workers exited'.format(worker_class))
+            time.sleep(0.2)
+    stop_server(server)
+    raise SystemExit('gunicorn with {} workers did not start'.format(worker_class))
+
+
+def stop_server(server):
+    server.send_signal(signal.SIGTERM)
+    server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=8, help='threads per gthread worker')
+    parser.add_argument('--connections', type=int, default=100,
+                        help='greenlets per gevent worker')
+    parser.add_argument('--concurrency', type=int, default=32, help='concurrent clients')
+    parser.add_argument('--requests', type=int, default=1000, help='requests per route')
+    parser.add_argument('--warmup', type=int, default=50, help='untimed requests per route')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--with-cache', action='store_true',
+                        help='keep the response and fragment caches on')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    args = parser.parse_args()
+
+    routes = [route for route in bench_routes() if route[0] in ROUTES]
+    results = []
+    for worker_class in WORKER_CLASSES:
+        server = start_server(worker_class, args)
+        try:
+            client = Client('http://127.0.0.1:{}'.format(args.port), timeout=60)
+            ids = sample_ids(client)
+            for route in routes:
+                run_route(client, route, ids, args.warmup, args.concurrency, 1)
+                result = run_route(client, route, ids, args.requests, args.concurrency, 0)
+                result['worker_class'] = worker_class
+                results.append(result)
+        finally:
+            stop_server(server)
+
+    print('{} workers, {} concurrent clients, {} requests per route'.format(
+        args.workers, args.concurrency, args.requests))
+    print('{:<10} {:<8} {:>6} {:>9} {:>9} {:>10}'.format(
+        'workers', 'route', 'errors', 'p50 ms', 'p95 ms', 'req/s'))
+    for result in results:
+        print('{worker_class:<10} {route:<8} {errors:>6} {p50_ms:>9.1f} {p95_ms:>9.1f} '
+              '{throughput_rps:>10.1f}'.format(**result))
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({
+                'workers': args.workers,
+                'threads': args.threads,
+                'concurrency': args.concurrency,
+                'requests': args.requests,
+                'results': results
+            }, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+import csv
+import io
+import json
+import time
+from collections import namedtuple
+from itertools import islice
+
+from werkzeug.datastructures import MultiDict
+
+from forms import VenueForm, ArtistForm, ShowForm
+from models import db, Venue, Artist, Show, venue_geohash
+from counters import refresh_show_counts
+
+
+#----------------------------------------------------------------------------#
+# Bulk import of venues, artists and shows.
+#----------------------------------------------------------------------------#
+
+# form used to validate a record and the columns it is copied into
+KINDS = {
+    'venues': (VenueForm, [
+        'name', 'city', 'state', 'address', 'phone', 'image_link', 'genres',
+        'facebook_link', 'website_link', 'seeking_talent', 'seeking_description',
+        'latitude', 'longitude'
+    ]),
+    'artists': (ArtistForm, [
+        'name', 'city', 'state', 'phone', 'image_link', 'genres',
+        'facebook_link', 'website_link', 'seeking_venue', 'seeking_description'
+    ]),
+    'shows': (ShowForm, ['venue_id', 'artist_id', 'start_time']),
+}
+
+TRUE_VALUES = ('1', 'true', 't', 'yes', 'y', 'on')
+
+# stands in for a line that could not be read as a record; it is rejected
+# with `message` like a record failing validation
+MalformedRecord = namedtuple('MalformedRecord', ['message'])
+
+
+def read_records(stream, file_format):
+    """Yield (line number, record dict) from a CSV file with a header row or
+    from newline-delimited JSON. A line that is not valid JSON yields a
+    MalformedRecord instead."""
+    if file_format == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+    else:
+        for number, line in enumerate(stream, 1):
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                except ValueError as error:
+                    record = MalformedRecord('invalid JSON: {}'.format(error))
+                yield number, record
+
+
+def _formdata(record):
+    """Turn a CSV or JSON record into form data the way a browser would
+    post it: genres as repeated values, unchecked booleans left out."""
+    formdata = MultiDict()
+    for key, value in record.items():
+        if value is None:
+            continue
+        if key == 'genres':
+            genres = value if isinstance(value, list) else value.split(',')
+            for genre in genres:
+                formdata.add(key, genre.strip())
+        elif key in ('seeking_talent', 'seeking_venue'):
+            if value is True or str(value).strip().lower() in TRUE_VALUES:
+                formdata.add(key, 'y')
+        else:
+            formdata.add(key, str(value))
+    return formdata
+
+
+def _copy_value(value):
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, list):
+        return '{' + ','.join(
+            '"' + item.replace('\\', '\\\\').replace('"', '\\"') + '"' for item in value
+        ) + '}'
+    return value
+
+
+def _copy(table, columns, rows):
+    """COPY rows into `table` on the session's connection, inside its
+    transaction."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            'COPY {} ({}) FROM STDIN WITH (FORMAT csv)'.format(table, ', '.join(columns)),
+            buffer
+        )
+    finally:
+        cursor.close()
+
+
+def _existing_ids(model, ids):
+    if not ids:
+        return set()
+    rows = db.session.query(model.id).filter(model.id.in_(list(ids)))
+    return {id for id, in rows}
+
+
+def _validate(kind, records):
+    """Validate (key, record) pairs with the form of `kind`.
+
+    Returns the (key, row) pairs of the valid records, with the row in
+    the column order of KINDS, followed by the geohash for venues, and
+    the (key, errors) pairs of the others.
+    Show rows also need an existing venue and artist, which are looked up
+    with one query each for all the rows.
+    """
+    form_class, columns = KINDS[kind]
+    rows = []
+    rejects = []
+    for key, record in records:
+        if isinstance(record, MalformedRecord):
+            rejects.append((key, {'record': [record.message]}))
+            continue
+        if not isinstance(record, dict):
+            rejects.append((key, {'record': ['not an object']}))
+            continue
+        form = form_class(_formdata(record), meta={'csrf': False})
+        if form.validate():
+            row = [getattr(form, column).data for column in columns]
+            if kind == 'venues':
+                # COPY bypasses the ORM, which sets it on other writes
+                row.append(venue_geohash(form.latitude.data, form.longitude.data))
+            rows.append((key, row))
+        else:
+            rejects.append((key, form.errors))
+
+    if kind == 'shows':
+        venue_ids = _existing_ids(Venue, {row[0] for _, row in rows})
+        artist_ids = _existing_ids(Artist, {row[1] for _, row in rows})
+        resolved = []
+        for key, row in rows:
+            errors = {}
+            if row[0] not in venue_ids:
+                errors['venue_id'] = ['venue id does not exist']
+            if row[1] not in artist_ids:
+                errors['artist_id'] = ['artist id does not exist']
+            if errors:
+                rejects.append((key, errors))
+            else:
+                resolved.append((key, row))
+        rows = resolved
+    return rows, rejects
+
+
+def import_records(kind, records, batch_size=5000, on_batch=None, on_reject=None):
+    """Validate and COPY records into the table of `kind`.
+
+    Each record goes through the same form as the matching HTML handler.
+    Show rows are checked for their venue and artist with one query per
+    batch. Every batch is committed on its own, so a failure only loses
+    the batch in progress. `on_reject(line, errors)` is called for each
+    rejected record and `on_batch(imported, rejected, elapsed)` after each
+    batch. Returns (imported, rejected, elapsed seconds).
+    """
+    _, columns = KINDS[kind]
+    if kind == 'venues':
+        columns = columns + ['geohash']
+    records = iter(records)
+    imported = rejected = 0
+    started = time.monotonic()
+
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            break
+
+        rows, rejects = _validate(kind, batch)
+        rejected += len(rejects)
+        if on_reject:
+            for line, errors in rejects:
+                on_reject(line, errors)
+
+        try:
+            _copy(kind, columns, ([_copy_value(value) for value in row] for _, row in rows))
+            if kind == 'shows':
+                refresh_show_counts(
+                    venue_ids={row[0] for _, row in rows},
+                    artist_ids={row[1] for _, row in rows}
+                )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        imported += len(rows)
+        if on_batch:
+            on_batch(imported, rejected, time.monotonic() - started)
+
+    return imported, rejected, time.monotonic() - started
+
+
+def create_shows(records):
+    """Create the valid shows among a list of records with venue_id,
+    artist_id and start_time.
+
+    Validation costs two queries for the whole list, and the valid shows
+    are inserted with a single INSERT ... VALUES ... RETURNING statement.
+    Returns a result per record, in order: the id, venue_id and artist_id
+    of the new show, or {'errors': {field: [messages]}}. The caller
+    commits.
+    """
+    rows, rejects = _validate('shows', enumerate(records))
+    results = [None] * len(records)
+    for index, errors in rejects:
+        results[index] = {'errors': errors}
+    if not rows:
+        return results
+
+    # match the returned rows to the records by value, since the order of
+    # RETURNING is not guaranteed; identical records are interchangeable
+    pending = {}
+    for index, row in rows:
+        pending.setdefault(tuple(row), []).append(index)
+
+    table = Show.__table__
+    statement = table.insert() \
+        .values([dict(venue_id=venue_id, artist_id=artist_id, start_time=start_time)
+                 for _, (venue_id, artist_id, start_time) in rows]) \
+        .returning(table.c.id, table.c.venue_id, table.c.artist_id, table.c.start_time)
+    for id, venue_id, artist_id, start_time in db.session.execute(statement):
+        results[pending[(venue_id, artist_id, start_time)].pop(0)] = {
+            'id': id, 'venue_id': venue_id, 'artist_id': artist_id
+        }
+
+    refresh_show_counts(
+        venue_ids={row[0] for _, row in rows},
+        artist_ids={row[1] for _, row in rows}
+    )
+    return results
@@ -0,0 +1,173 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, session, make_response, current_app
+
+
+#----------------------------------------------------------------------------#
+# Rendered response cache.
+#----------------------------------------------------------------------------#
+
+class ResponseCache(object):
+    """Bounded LRU cache of rendered responses with a time to live.
+
+    Keys are (endpoint, view arguments, query string). Entries are dropped
+    explicitly by the write handlers through `invalidate`, and otherwise
+    expire after `ttl` seconds. The cache lives in the worker process, so
+    other workers only see a write once their own entry expires.
+    """
+
+    def __init__(self, maxsize=512, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, endpoint, **view_args):
+        """Drop every cached page of `endpoint` rendered for `view_args`,
+        whatever its query string."""
+        view_args = tuple(sorted(view_args.items()))
+        with self._lock:
+            stale = [key for key in self._entries
+                     if key[0] == endpoint and key[1] == view_args]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl
+            }
+
+
+response_cache = ResponseCache()
+
+# rendered template fragments, keyed by (name, (('id', id),), version)
+fragment_cache = ResponseCache(maxsize=4096, ttl=3600)
+
+
+def init_cache(app):
+    response_cache.maxsize = app.config.get('RESPONSE_CACHE_SIZE', 512)
+    response_cache.ttl = app.config.get('RESPONSE_CACHE_TTL', 60)
+    fragment_cache.maxsize = app.config.get('FRAGMENT_CACHE_SIZE', 4096)
+    fragment_cache.ttl = app.config.get('FRAGMENT_CACHE_TTL', 3600)
+    app.jinja_env.globals['fragment'] = fragment
+
+
+def cached(view):
+    """Serve a GET view from `response_cache`, rendering it on a miss.
+
+    Requests with pending flash messages bypass the cache, since the
+    messages are rendered into the page and must be consumed.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_app.config.get('RESPONSE_CACHE_ENABLED', True) \
+                or session.get('_flashes'):
+            return view(*args, **kwargs)
+
+        key = (
+            request.endpoint,
+            tuple(sorted(request.view_args.items())),
+            request.query_string
+        )
+        entry = response_cache.get(key)
+        if entry is not None:
+            body, headers = entry
+            response = current_app.response_class(body, headers=headers)
+            response.headers['X-Cache'] = 'HIT'
+            return response
+
+        response = make_response(view(*args, **kwargs))
+        if response.status_code == 200 and not response.is_streamed:
+            response_cache.set(key, (response.get_data(), list(response.headers)))
+        response.headers['X-Cache'] = 'MISS'
+        return response
+    return wrapper
+
+
+def fragment(name, id, version, caller):
+    """Render the body of a `{% call fragment(name, id, version) %}` block
+    once per entity version and reuse it afterwards.
+
+    `version` must change whenever anything rendered in the block does,
+    e.g. an updated_at column, so a changed row gets a new entry while the
+    unchanged rows of the same page come from the cache.
+    """
+    if not current_app.config.get('FRAGMENT_CACHE_ENABLED', True):
+        return caller()
+    key = (name, (('id', id),), version)
+    html = fragment_cache.get(key)
+    if html is None:
+        html = caller()
+        fragment_cache.set(key, html)
+    return html
+
+
+#----------------------------------------------------------------------------#
+# Invalidation of the app's pages.
+#----------------------------------------------------------------------------#
+
+def invalidate_venue(venue_id, artist_ids=()):
+    """Drop the venue page, every listing showing the venue and the pages
+    of artists playing there."""
+    response_cache.invalidate('venues.show_venue', venue_id=venue_id)
+    response_cache.invalidate('venues.venues')
+    response_cache.invalidate('shows.shows')
+    fragment_cache.invalidate('venue', id=venue_id)
+    for artist_id in artist_ids:
+        response_cache.invalidate('artists.show_artist', artist_id=artist_id)
+
+
+def invalidate_artist(artist_id, venue_ids=()):
+    response_cache.invalidate('artists.show_artist', artist_id=artist_id)
+    fragment_cache.invalidate('artist', id=artist_id)
+    response_cache.invalidate('artists.artists')
+    response_cache.invalidate('shows.shows')
+    for venue_id in venue_ids:
+        response_cache.invalidate('venues.show_venue', venue_id=venue_id)
+
+
+def invalidate_show(venue_id, artist_id):
+    invalidate_shows([venue_id], [artist_id])
+
+
+def invalidate_shows(venue_ids, artist_ids):
+    """Drop the pages listing new shows of `venue_ids` and `artist_ids`."""
+    for venue_id in venue_ids:
+        response_cache.invalidate('venues.show_venue', venue_id=venue_id)
+    for artist_id in artist_ids:
+        response_cache.invalidate('artists.show_artist', artist_id=artist_id)
+    response_cache.invalidate('shows.shows')
+    response_cache.invalidate('venues.venues')
@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+from datetime import timezone
+from functools import wraps
+
+from flask import current_app, g, make_response, request, session
+
+
+#----------------------------------------------------------------------------#
+# Conditional GET.
+#----------------------------------------------------------------------------#
+
+def _build_id(app):
+    """BUILD_ID, or a hash of the templates and of the asset manifest in
+    use, computed once per process."""
+    build_id = app.extensions.get('build_id')
+    if build_id is None:
+        build_id = app.config.get('BUILD_ID')
+        if not build_id:
+            digest = hashlib.sha1()
+            digest.update(json.dumps(app.extensions.get('assets_manifest'), sort_keys=True).encode('utf-8'))
+            for root, dirs, files in os.walk(os.path.join(app.root_path, app.template_folder)):
+                dirs.sort()
+                for name in sorted(files):
+                    path = os.path.join(root, name)
+                    digest.update(os.path.relpath(path, app.root_path).encode('utf-8'))
+                    with open(path, 'rb') as template:
+                        digest.update(template.read())
+            build_id = digest.hexdigest()
+        app.extensions['build_id'] = build_id
+    return build_id
+
+
+def _etag(endpoint, fingerprint):
+    raw = repr((_build_id(current_app), endpoint, fingerprint)).encode('utf-8')
+    return hashlib.sha1(raw).hexdigest()[:20]
+
+
+def _utc(value):
+    """`value` as an aware UTC datetime; naive ones are taken to be UTC, as
+    Werkzeug before 2.0 parses HTTP dates."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if request.if_modified_since and last_modified is not None:
+        return _utc(last_modified).replace(microsecond=0) <= _utc(request.if_modified_since)
+    return False
+
+
+def conditional(version):
+    """Send ETag and Last-Modified with a GET view, and answer a matching
+    If-None-Match or If-Modified-Since with 304 before the view runs.
+
+    `version(**view_args)` returns (last modified time in UTC, fingerprint)
+    for what the view renders, or None when it does not exist, and should
+    cost far less than the view. The ETag hashes the build (see BUILD_ID)
+    and the endpoint with the version, so a deploy changing the pages
+    does not answer 304 for copies rendered before it. The view can read
+    the version from `g.version` instead of computing it again. Requests
+    with pending flash messages are always rendered, as by `cache.cached`.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_app.config.get('CONDITIONAL_GET_ENABLED', True) \
+                    or session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            current = version(**kwargs)
+            if current is None:
+                return view(*args, **kwargs)
+
+            g.version = current
+            last_modified, fingerprint = current
+            if last_modified is not None:
+                last_modified = _utc(last_modified)
+            etag = _etag(request.endpoint, current)
+
+            if _not_modified(etag, last_modified):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            # cached copies must be revalidated, which is what makes them cheap
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
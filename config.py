@@ -1,10 +1,14 @@
 import os
-SECRET_KEY = os.urandom(32)
 # Grabs the folder where the script runs.
 basedir = os.path.abspath(os.path.dirname(__file__))
 
-# Enable debug mode.
-DEBUG = True
+# Enable debug mode. wsgi.py turns it off unless DEBUG=1 is set.
+DEBUG = os.environ.get('DEBUG', '1') == '1'
+
+# Signs sessions and flash messages, so every worker must use the same key.
+# Only debug mode falls back to a known key; create_app() refuses to start
+# without SECRET_KEY otherwise.
+SECRET_KEY = os.environ.get('SECRET_KEY', 'fyyur-development-key' if DEBUG else None)
 
 # Connect to the database
 
@@ -15,5 +19,72 @@ database_password = os.environ.get('database_password')
 database_username = 'testuser'
 database_password = ''
 database_name = 'fyyur'
-SQLALCHEMY_DATABASE_URI = 'postgresql://{}:{}@{}/{}'.format(database_username,database_password,'localhost:5432',database_name)
-SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'postgresql://{}:{}@{}/{}'.format(database_username,database_password,'localhost:5432',database_name)
+SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Connection pool, per worker process: up to DB_POOL_SIZE idle connections
+# kept open, DB_MAX_OVERFLOW more under load, and a request waits up to
+# DB_POOL_TIMEOUT seconds for one before failing. Connections are replaced
+# after DB_POOL_RECYCLE seconds and checked before use when
+# DB_POOL_PRE_PING is set.
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', '1') == '1'
+
+# Server-side limits on every statement and lock wait, 0 to disable.
+DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 30000))
+DB_LOCK_TIMEOUT_MS = int(os.environ.get('DB_LOCK_TIMEOUT_MS', 0))
+
+# Set when DATABASE_URL points at PgBouncer in transaction pooling mode:
+# the app then keeps no pool of its own and applies the limits above per
+# transaction.
+DB_PGBOUNCER = os.environ.get('DB_PGBOUNCER', '0') == '1'
+
+# Load the fingerprinted bundles built by `flask build-assets` when they
+# exist. Turn off while editing static files to load the sources directly.
+USE_BUILT_ASSETS = os.environ.get('USE_BUILT_ASSETS', '1') == '1'
+
+# Compiled templates are cached here, shared by the workers and kept across
+# restarts. Empty to compile templates in every worker.
+JINJA_BYTECODE_CACHE_DIR = os.environ.get('JINJA_BYTECODE_CACHE_DIR', os.path.join(basedir, '.jinja-cache'))
+
+# Number of rows per page on the venue, artist and show listings.
+PAGE_SIZE = int(os.environ.get('PAGE_SIZE', 20))
+
+# Most rows a venue, artist or show search returns; the total number of
+# matches is reported alongside.
+SEARCH_LIMIT = int(os.environ.get('SEARCH_LIMIT', 50))
+
+# Default and largest radius, in km, of a /venues/nearby search.
+NEARBY_RADIUS_KM = float(os.environ.get('NEARBY_RADIUS_KM', 10))
+NEARBY_MAX_RADIUS_KM = float(os.environ.get('NEARBY_MAX_RADIUS_KM', 500))
+
+# In-process cache of rendered GET pages, dropped by the write handlers.
+RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', '1') == '1'
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 512))
+RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 60))
+
+# Rendered rows of the listing pages, keyed by id and updated_at, so a page
+# missing from the response cache only renders the rows that changed.
+FRAGMENT_CACHE_ENABLED = os.environ.get('FRAGMENT_CACHE_ENABLED', '1') == '1'
+FRAGMENT_CACHE_SIZE = int(os.environ.get('FRAGMENT_CACHE_SIZE', 4096))
+FRAGMENT_CACHE_TTL = int(os.environ.get('FRAGMENT_CACHE_TTL', 3600))
+
+# ETag / Last-Modified on the listing and detail pages, with 304 answers
+# to conditional requests, based on the updated_at columns.
+CONDITIONAL_GET_ENABLED = os.environ.get('CONDITIONAL_GET_ENABLED', '1') == '1'
+# Part of every ETag, so a deploy changing the pages invalidates the copies
+# clients hold, e.g. the commit being deployed. When unset, a hash of the
+# templates and the asset manifest is used.
+BUILD_ID = os.environ.get('BUILD_ID')
+
+# Per-request SQL instrumentation: X-DB-Queries / X-DB-Time response
+# headers, and a warning for requests that run the same statement more
+# than SQL_REPEAT_THRESHOLD times (N+1) or spend longer than
+# SQL_SLOW_REQUEST_MS in the database.
+SQL_INSTRUMENTATION = os.environ.get('SQL_INSTRUMENTATION', '1') == '1'
+SQL_REPEAT_THRESHOLD = int(os.environ.get('SQL_REPEAT_THRESHOLD', 10))
+SQL_SLOW_REQUEST_MS = int(os.environ.get('SQL_SLOW_REQUEST_MS', 500))
+SQL_SLOWEST_LOGGED = 5
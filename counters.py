@@ -0,0 +1,76 @@
+from datetime import datetime
+
+from models import db, Venue, Artist, Show
+
+
+#----------------------------------------------------------------------------#
+# Upcoming/past show counters.
+#----------------------------------------------------------------------------#
+
+def _lock(model, ids):
+    """Lock the rows about to be recounted until the transaction ends.
+
+    A recount is a subquery, and an UPDATE that waits for another
+    transaction's row lock re-runs on the row it committed but keeps its
+    own older count: two shows created together for one venue could
+    count as one. Taking the locks first, in a statement of their own,
+    makes the recount start after the other transaction has committed and
+    see its shows. FOR NO KEY UPDATE does not block the KEY SHARE locks
+    taken by inserting shows; ids are locked in order, so that two
+    transactions do not wait for each other.
+    """
+    if ids is None:
+        # reads go on; show inserts and recounts wait for the full refresh
+        db.session.execute('LOCK TABLE {} IN EXCLUSIVE MODE'.format(model.__tablename__))
+    else:
+        db.session.query(model.id).filter(model.id.in_(list(ids))) \
+                  .order_by(model.id).with_for_update(key_share=True).all()
+
+
+def _refresh(model, foreign_key, ids, now):
+    def count(condition):
+        return db.select([db.func.count(Show.id)]) \
+                 .where(db.and_(foreign_key == model.id, condition)) \
+                 .as_scalar()
+
+    upcoming = count(Show.start_time > now)
+    past = count(Show.start_time <= now)
+    statement = model.__table__.update() \
+        .values(upcoming_shows_count=upcoming, past_shows_count=past) \
+        .where(db.or_(model.upcoming_shows_count != upcoming,
+                      model.past_shows_count != past))
+    if ids is not None:
+        if not ids:
+            return 0
+        statement = statement.where(model.id.in_(list(ids)))
+    _lock(model, ids)
+    return db.session.execute(statement).rowcount
+
+
+def refresh_show_counts(venue_ids=None, artist_ids=None, now=None):
+    """Recompute the stored upcoming/past show counts.
+
+    Only the given venues and artists are refreshed; passing None for
+    either refreshes all rows of that table. Rows whose counts are already
+    right are left untouched. Runs in the caller's transaction, which keeps
+    the refreshed rows locked until it ends, and returns the number of
+    rows updated.
+    """
+    now = now or datetime.now()
+    return _refresh(Venue, Show.venue_id, venue_ids, now) + \
+           _refresh(Artist, Show.artist_id, artist_ids, now)
+
+
+def refresh_started_shows(since, now=None):
+    """Move shows that started within the last `since` (a timedelta) from
+    the upcoming to the past counts of their venues and artists."""
+    now = now or datetime.now()
+    started = db.session.query(Show.venue_id, Show.artist_id) \
+                        .filter(Show.start_time > now - since,
+                                Show.start_time <= now) \
+                        .all()
+    return refresh_show_counts(
+        venue_ids={venue_id for venue_id, _ in started},
+        artist_ids={artist_id for _, artist_id in started},
+        now=now
+    )
@@ -83,4 +83,8 @@ class State(enum.Enum):
     @classmethod
     def choices(cls):
         return [(choice.name, choice.value) for choice in cls]
-    
\ No newline at end of file
+    
+
+# allowed genre and state values, built once rather than on every validation
+GENRE_NAMES = frozenset(name for name, _ in Genre.choices())
+STATE_NAMES = frozenset(name for name, _ in State.choices())
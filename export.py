@@ -0,0 +1,78 @@
+import csv
+import io
+import json
+
+import queries
+
+
+#----------------------------------------------------------------------------#
+# Streaming export of shows.
+#----------------------------------------------------------------------------#
+
+COLUMNS = ['id', 'start_time', 'venue_id', 'venue_name', 'artist_id', 'artist_name']
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# rows fetched from the server-side cursor, and written out, at a time
+BATCH_SIZE = 2000
+
+
+def iter_shows(start=None, end=None, venue_id=None, batch_size=BATCH_SIZE):
+    """Yield every show joined with its venue and artist names, ordered by
+    start time, optionally limited to start times in [start, end) and to
+    one venue.
+
+    The rows are those of the /shows listing, window included, read from a
+    server-side cursor `batch_size` at a time, so memory use does not
+    depend on the size of the table.
+    """
+    return queries.show_rows(start, end, venue_id, batch_size)
+
+
+def _values(row):
+    # in the order of COLUMNS
+    return [row.id, row.start_time.isoformat(), row.venue_id, row.venue_name,
+            row.artist_id, row.artist_name]
+
+
+def _batches(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _csv_chunks(rows, batch_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for batch in _batches(rows, batch_size):
+        writer.writerows(_values(row) for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _ndjson_chunks(rows, batch_size):
+    for batch in _batches(rows, batch_size):
+        yield ''.join(
+            json.dumps(dict(zip(COLUMNS, _values(row))), separators=(',', ':')) + '\n'
+            for row in batch
+        )
+
+
+def export_chunks(file_format, rows, batch_size=BATCH_SIZE):
+    """Serialize rows from `iter_shows` into text chunks of `batch_size`
+    rows in `file_format` ('csv' with a header row, or 'ndjson')."""
+    if file_format == 'csv':
+        return _csv_chunks(rows, batch_size)
+    return _ndjson_chunks(rows, batch_size)
@@ -1,9 +1,9 @@
 from datetime import datetime
 from flask_wtf import FlaskForm as Form
-from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField, IntegerField
-from wtforms.validators import DataRequired, AnyOf, URL, Optional
+from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField, IntegerField, FloatField
+from wtforms.validators import DataRequired, AnyOf, URL, Optional, NumberRange
 import re
-from enums import Genre, State
+from enums import Genre, State, GENRE_NAMES, STATE_NAMES
 
 def is_valid_phone(number):
     """ Validate phone numbers like:
@@ -44,12 +44,15 @@ class VenueForm(Form):
         if not is_valid_phone(self.phone.data):
             self.phone.errors.append('Invalid phone.')
             return False
-        if not set(self.genres.data).issubset(dict(Genre.choices()).keys()):
+        if not GENRE_NAMES.issuperset(self.genres.data):
             self.genres.errors.append('Invalid genres.')
             return False
-        if self.state.data not in dict(State.choices()).keys():
+        if self.state.data not in STATE_NAMES:
             self.state.errors.append('Invalid state.')
             return False
+        if (self.latitude.data is None) != (self.longitude.data is None):
+            self.longitude.errors.append('Give both latitude and longitude, or neither.')
+            return False
         # if pass validation
         return True
 
@@ -91,6 +94,13 @@ class VenueForm(Form):
         'seeking_description'
     )
 
+    latitude = FloatField(
+        'latitude', validators=[Optional(), NumberRange(-90, 90)]
+    )
+    longitude = FloatField(
+        'longitude', validators=[Optional(), NumberRange(-180, 180)]
+    )
+
 
 
 class ArtistForm(Form):
@@ -102,10 +112,10 @@ class ArtistForm(Form):
         if not is_valid_phone(self.phone.data):
             self.phone.errors.append('Invalid phone.')
             return False
-        if not set(self.genres.data).issubset(dict(Genre.choices()).keys()):
+        if not GENRE_NAMES.issuperset(self.genres.data):
             self.genres.errors.append('Invalid genres.')
             return False
-        if self.state.data not in dict(State.choices()).keys():
+        if self.state.data not in STATE_NAMES:
             self.state.errors.append('Invalid state.')
             return False
         # if pass validation
@@ -0,0 +1,152 @@
+import math
+
+
+#----------------------------------------------------------------------------#
+# Geohashes.
+#----------------------------------------------------------------------------#
+
+# A geohash names a cell of a grid over latitude and longitude: its bits
+# interleave the longitude and latitude cell numbers, five bits per
+# character, so the cells of a longer hash nest inside those of its
+# prefixes. The characters sort in the order of the bits they spell, so
+# hashes sort in cell number order and the cells of a prefix form one key
+# range. Venues store the 12 character hash of their coordinates and a
+# search for the venues around a point becomes a few range scans of the
+# index on it.
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+PRECISION = 12
+
+EARTH_RADIUS_KM = 6371.0
+# shortest distance covered by a degree of latitude, and the distance
+# covered by a degree of longitude at the equator
+KM_PER_DEGREE_LAT = 110.574
+KM_PER_DEGREE_LNG = 111.320
+
+# most key ranges a search may scan, and most cells it considers; larger
+# areas use shorter, coarser hashes
+MAX_RANGES = 16
+MAX_CELLS = 256
+
+# sorts after every hash, ending the range of the grid's last cell
+END = '~'
+
+
+def _bits(precision):
+    """(latitude bits, longitude bits) of a hash of `precision` characters."""
+    bits = 5 * precision
+    return bits // 2, bits - bits // 2
+
+
+def _cell_size(precision):
+    """(height, width) in degrees of the cells of `precision` characters."""
+    lat_bits, lng_bits = _bits(precision)
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def _spread(index):
+    """`index` with a zero bit slipped in above each of its bits."""
+    value = 0
+    bit = 0
+    while index:
+        value |= (index & 1) << (2 * bit)
+        index >>= 1
+        bit += 1
+    return value
+
+
+def _shifts(precision):
+    """(latitude shift, longitude shift) of the spread row and column
+    numbers in a cell number: the bits alternate starting with longitude,
+    most significant first, so the last bit is latitude's when the hash
+    has an even number of bits."""
+    return (1, 0) if precision % 2 else (0, 1)
+
+
+def _interleave(lat_index, lng_index, precision):
+    """The number of the cell with the given row and column numbers."""
+    lat_shift, lng_shift = _shifts(precision)
+    return (_spread(lat_index) << lat_shift) | (_spread(lng_index) << lng_shift)
+
+
+def _hash(value, precision):
+    """The hash spelling cell number `value`, five bits per character."""
+    return ''.join(BASE32[(value >> shift) & 31]
+                   for shift in range(5 * (precision - 1), -1, -5))
+
+
+def _indexes(latitude, longitude, precision):
+    height, width = _cell_size(precision)
+    lat_bits, lng_bits = _bits(precision)
+    lat_index = min(int((latitude + 90.0) // height), (1 << lat_bits) - 1)
+    lng_index = min(int((longitude + 180.0) // width), (1 << lng_bits) - 1)
+    return lat_index, lng_index
+
+
+def encode(latitude, longitude, precision=PRECISION):
+    """The geohash of a point, `precision` characters long."""
+    return _hash(_interleave(*_indexes(latitude, longitude, precision), precision=precision),
+                 precision)
+
+
+def _ranges(cells, precision):
+    """Merge sorted cell numbers into (first hash, hash after the last)
+    ranges."""
+    ranges = []
+    for cell in cells:
+        if ranges and ranges[-1][1] == cell:
+            ranges[-1][1] = cell + 1
+        else:
+            ranges.append([cell, cell + 1])
+    end = 1 << (5 * precision)
+    return [(_hash(first, precision), _hash(last, precision) if last < end else END)
+            for first, last in ranges]
+
+
+def covering(latitude, longitude, radius):
+    """(low, high) geohash ranges holding every point within `radius` km
+    of a point, at most MAX_RANGES of them: a hash h is inside one when
+    low <= h < high.
+
+    Cells next to each other in hash order merge into one range, so the
+    finest precision within budget is chosen by ranges, not cells. Returns
+    None when the circle reaches a pole or spans every longitude, where no
+    small set of cells covers it.
+    """
+    dlat = radius / KM_PER_DEGREE_LAT
+    lat_edge = abs(latitude) + dlat
+    if lat_edge >= 90.0:
+        return None
+    # a degree of longitude is shortest on the side nearest the pole
+    dlng = radius / (KM_PER_DEGREE_LNG * math.cos(math.radians(lat_edge)))
+    if dlng >= 180.0:
+        return None
+
+    for precision in range(PRECISION, 0, -1):
+        south, west = _indexes(latitude - dlat, longitude - dlng, precision)
+        north, east = _indexes(latitude + dlat, longitude + dlng, precision)
+        columns = 1 << _bits(precision)[1]
+        if longitude - dlng < -180.0 or longitude + dlng >= 180.0:
+            # the box crosses the antimeridian: wrap the columns around
+            west = _indexes(latitude, (longitude - dlng + 540.0) % 360.0 - 180.0, precision)[1]
+            east = _indexes(latitude, (longitude + dlng + 540.0) % 360.0 - 180.0, precision)[1]
+        width = (east - west) % columns + 1
+        if (north - south + 1) * width > MAX_CELLS:
+            continue
+        lat_shift, lng_shift = _shifts(precision)
+        rows = [_spread(row) << lat_shift for row in range(south, north + 1)]
+        cells = sorted({row | (_spread((west + column) % columns) << lng_shift)
+                        for column in range(width) for row in rows})
+        ranges = _ranges(cells, precision)
+        if len(ranges) <= MAX_RANGES:
+            return ranges
+    return None
+
+
+def distance(latitude, longitude, other_latitude, other_longitude):
+    """Great-circle distance in km between two points (haversine)."""
+    dlat = math.radians(other_latitude - latitude) / 2
+    dlng = math.radians(other_longitude - longitude) / 2
+    a = math.sin(dlat) ** 2 + \
+        math.cos(math.radians(latitude)) * math.cos(math.radians(other_latitude)) * math.sin(dlng) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
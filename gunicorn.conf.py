@@ -0,0 +1,37 @@
+"""Gunicorn settings for serving wsgi:app, read from the environment.
+
+WSGI_WORKER_CLASS picks the concurrency model of each worker process:
+
+- sync: one request at a time. Simple and isolated, but a slow request,
+  or a slow client, holds a whole process.
+- gthread: WSGI_THREADS requests at a time, in threads.
+- gevent: up to WSGI_WORKER_CONNECTIONS requests at a time, in greenlets.
+  psycopg2 then waits for the database cooperatively (see pooling.py).
+
+Each worker keeps its own database pool, sized to the requests it runs at
+once unless DB_POOL_SIZE is set. Keep WEB_CONCURRENCY x (DB_POOL_SIZE +
+DB_MAX_OVERFLOW) under the server's max_connections.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '127.0.0.1:8000')
+worker_class = os.environ.get('WSGI_WORKER_CLASS', 'sync')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('WSGI_THREADS', 8)) if worker_class == 'gthread' else 1
+worker_connections = int(os.environ.get('WSGI_WORKER_CONNECTIONS', 100))
+timeout = int(os.environ.get('WSGI_TIMEOUT', 30))
+keepalive = 5
+
+if worker_class == 'gthread':
+    concurrency = threads
+elif worker_class == 'gevent':
+    # greenlets beyond the pool wait for a connection, up to DB_POOL_TIMEOUT
+    concurrency = min(worker_connections, 10)
+else:
+    concurrency = 1
+# read by config.py in each worker, which imports the app after the fork
+os.environ.setdefault('DB_POOL_SIZE', str(concurrency))
+
+accesslog = os.environ.get('WSGI_ACCESS_LOG')
+errorlog = '-'
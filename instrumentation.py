@@ -0,0 +1,101 @@
+import re
+import time
+from collections import Counter
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from models import db
+
+
+#----------------------------------------------------------------------------#
+# Per-request SQL instrumentation.
+#----------------------------------------------------------------------------#
+
+_PARAMETER = re.compile(r'%\(\w+\)s|%s|\?')
+_IN_LIST = re.compile(r'IN \((?:\?, )+\?\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def statement_shape(statement):
+    """Normalize a statement so executions differing only in their bound
+    values, or the length of an IN list, compare equal."""
+    shape = _PARAMETER.sub('?', statement)
+    shape = _IN_LIST.sub('IN (?)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+# The start time is kept on the execution context, which lasts one
+# execution: a statement that fails leaves nothing behind on the pooled
+# connection for the next one to pick up.
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_query_start_time', None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    if has_request_context() and 'sql_statements' in g:
+        g.sql_statements.append((elapsed, statement))
+
+
+def _start_request():
+    g.sql_statements = []
+
+
+def _report(response):
+    """Add the statement count and DB time of the request to its headers,
+    and log requests that repeat a statement shape or spend too long in
+    the database.
+
+    Statements run while a streamed response is being sent happen after
+    this point and are not counted.
+    """
+    statements = g.pop('sql_statements', None)
+    if statements is None:
+        return response
+
+    config = current_app.config
+    total = sum(elapsed for elapsed, _ in statements)
+    response.headers['X-DB-Queries'] = str(len(statements))
+    response.headers['X-DB-Time'] = '{:.1f}ms'.format(total * 1000)
+
+    shapes = Counter(statement_shape(statement) for _, statement in statements)
+    shape, repeats = shapes.most_common(1)[0] if shapes else (None, 0)
+    repeated = repeats > config['SQL_REPEAT_THRESHOLD']
+    if repeated:
+        response.headers['X-DB-Repeated'] = str(repeats)
+
+    if repeated or total * 1000 > config['SQL_SLOW_REQUEST_MS']:
+        slowest = sorted(statements, key=lambda item: item[0], reverse=True)
+        slowest = '\n'.join('  {:.1f}ms {}'.format(elapsed * 1000, statement_shape(statement))
+                            for elapsed, statement in slowest[:config['SQL_SLOWEST_LOGGED']])
+        if repeated:
+            current_app.logger.warning(
+                'Possible N+1 in %s %s: %d statements, %d runs of: %s\nslowest:\n%s',
+                request.method, request.path, len(statements), repeats, shape, slowest)
+        else:
+            current_app.logger.warning(
+                'Slow SQL in %s %s: %d statements in %.1fms\nslowest:\n%s',
+                request.method, request.path, len(statements), total * 1000, slowest)
+    return response
+
+
+def init_sql_instrumentation(app):
+    """Record the statements each request runs on the `models.db` engine."""
+    app.config.setdefault('SQL_INSTRUMENTATION', True)
+    app.config.setdefault('SQL_REPEAT_THRESHOLD', 10)
+    app.config.setdefault('SQL_SLOW_REQUEST_MS', 500)
+    app.config.setdefault('SQL_SLOWEST_LOGGED', 5)
+    if not app.config['SQL_INSTRUMENTATION']:
+        return
+
+    engine = db.get_engine(app)
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    app.before_request(_start_request)
+    app.after_request(_report)
@@ -0,0 +1,24 @@
+"""index shows on start time
+
+Revision ID: 123c0f15c6c9
+Revises: 6afd395f3f8d
+Create Date: 2026-10-18 17:14:28.619194
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '123c0f15c6c9'
+down_revision = '6afd395f3f8d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_shows_start_time_id', 'shows', ['start_time', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_shows_start_time_id', table_name='shows')
@@ -0,0 +1,30 @@
+"""updated_at timestamps
+
+Revision ID: 6afd395f3f8d
+Revises: b6a9da0db6e8
+Create Date: 2026-10-18 17:01:33.336572
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6afd395f3f8d'
+down_revision = 'b6a9da0db6e8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('venues', 'artists', 'shows'):
+        op.add_column(table, sa.Column(
+            'updated_at', sa.DateTime(), nullable=False,
+            server_default=sa.text("(now() at time zone 'utc')")))
+        op.create_index('ix_{}_updated_at'.format(table), table, ['updated_at'])
+
+
+def downgrade():
+    for table in ('venues', 'artists', 'shows'):
+        op.drop_index('ix_{}_updated_at'.format(table), table_name=table)
+        op.drop_column(table, 'updated_at')
@@ -0,0 +1,28 @@
+"""record deletions for listing versions
+
+Revision ID: 8074ecbeb92f
+Revises: fbf362a6e0ac
+Create Date: 2026-10-18 17:47:46.710470
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8074ecbeb92f'
+down_revision = 'fbf362a6e0ac'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('deletions',
+    sa.Column('table_name', sa.String(length=64), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+
+
+def downgrade():
+    op.drop_table('deletions')
@@ -0,0 +1,30 @@
+"""venue coordinates and geohash index
+
+Revision ID: 9da043410704
+Revises: 123c0f15c6c9
+Create Date: 2026-10-18 17:16:59.679235
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9da043410704'
+down_revision = '123c0f15c6c9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('venues', sa.Column('latitude', sa.Float(), nullable=True))
+    op.add_column('venues', sa.Column('longitude', sa.Float(), nullable=True))
+    op.add_column('venues', sa.Column('geohash', sa.String(length=12, collation='C'), nullable=True))
+    op.create_index('ix_venues_geohash', 'venues', ['geohash', 'latitude', 'longitude', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_venues_geohash', table_name='venues')
+    op.drop_column('venues', 'geohash')
+    op.drop_column('venues', 'longitude')
+    op.drop_column('venues', 'latitude')
@@ -0,0 +1,26 @@
+"""gin indexes on venue and artist genres
+
+Revision ID: b6a9da0db6e8
+Revises: e1669884865a
+Create Date: 2026-10-18 16:58:20.173897
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6a9da0db6e8'
+down_revision = 'e1669884865a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_venues_genres', 'venues', ['genres'], postgresql_using='gin')
+    op.create_index('ix_artists_genres', 'artists', ['genres'], postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('ix_artists_genres', table_name='artists')
+    op.drop_index('ix_venues_genres', table_name='venues')
@@ -0,0 +1,56 @@
+"""index shows foreign keys and start time
+
+Revision ID: d84842569d83
+Revises: ce3c8fdd9a42
+Create Date: 2026-10-18 16:43:23.632701
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd84842569d83'
+down_revision = 'ce3c8fdd9a42'
+branch_labels = None
+depends_on = None
+
+
+FOREIGN_KEYS = (('venues', 'venue_id'), ('artists', 'artist_id'))
+
+
+def upgrade():
+    # shows without a venue or an artist are never displayed, remove them
+    # before the foreign keys become NOT NULL. This cannot be undone:
+    # downgrade() makes the columns nullable again but does not bring the
+    # deleted shows back, so take a backup first if they matter.
+    op.execute('DELETE FROM shows WHERE venue_id IS NULL OR artist_id IS NULL')
+    op.alter_column('shows', 'venue_id',
+               existing_type=sa.INTEGER(),
+               nullable=False)
+    op.alter_column('shows', 'artist_id',
+               existing_type=sa.INTEGER(),
+               nullable=False)
+    # with both keys required, deleting a venue or an artist must take its
+    # shows along, or the delete fails on the foreign key
+    for table, foreign_key in FOREIGN_KEYS:
+        name = 'shows_{}_fkey'.format(foreign_key)
+        op.drop_constraint(name, 'shows', type_='foreignkey')
+        op.create_foreign_key(name, 'shows', table, [foreign_key], ['id'], ondelete='CASCADE')
+    op.create_index('ix_shows_venue_id_start_time', 'shows', ['venue_id', 'start_time'], unique=False)
+    op.create_index('ix_shows_artist_id_start_time', 'shows', ['artist_id', 'start_time'], unique=False)
+
+
+def downgrade():
+    for table, foreign_key in FOREIGN_KEYS:
+        name = 'shows_{}_fkey'.format(foreign_key)
+        op.drop_constraint(name, 'shows', type_='foreignkey')
+        op.create_foreign_key(name, 'shows', table, [foreign_key], ['id'])
+    op.drop_index('ix_shows_artist_id_start_time', table_name='shows')
+    op.drop_index('ix_shows_venue_id_start_time', table_name='shows')
+    op.alter_column('shows', 'artist_id',
+               existing_type=sa.INTEGER(),
+               nullable=True)
+    op.alter_column('shows', 'venue_id',
+               existing_type=sa.INTEGER(),
+               nullable=True)
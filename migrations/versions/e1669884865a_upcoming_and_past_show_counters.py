@@ -0,0 +1,36 @@
+"""upcoming and past show counters
+
+Revision ID: e1669884865a
+Revises: d84842569d83
+Create Date: 2026-10-18 16:45:29.864933
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1669884865a'
+down_revision = 'd84842569d83'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table, foreign_key in (('venues', 'venue_id'), ('artists', 'artist_id')):
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(), server_default='0', nullable=False))
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(), server_default='0', nullable=False))
+        op.execute(
+            'UPDATE {table} SET '
+            'upcoming_shows_count = (SELECT count(*) FROM shows '
+            'WHERE shows.{fk} = {table}.id AND shows.start_time > now()), '
+            'past_shows_count = (SELECT count(*) FROM shows '
+            'WHERE shows.{fk} = {table}.id AND shows.start_time <= now())'
+            .format(table=table, fk=foreign_key)
+        )
+
+
+def downgrade():
+    for table in ('artists', 'venues'):
+        op.drop_column(table, 'past_shows_count')
+        op.drop_column(table, 'upcoming_shows_count')
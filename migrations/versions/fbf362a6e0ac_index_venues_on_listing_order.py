@@ -0,0 +1,26 @@
+"""index venues on listing order
+
+Revision ID: fbf362a6e0ac
+Revises: 9da043410704
+Create Date: 2026-10-18 17:45:48.473394
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'fbf362a6e0ac'
+down_revision = '9da043410704'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # the /venues listing sorts and pages on these three expressions
+    op.create_index('ix_venues_area', 'venues',
+                    [sa.text("coalesce(state, '')"), sa.text("coalesce(city, '')"), 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_venues_area', table_name='venues')
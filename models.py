@@ -1,26 +1,80 @@
+from datetime import datetime
+
+from flask import _app_ctx_stack
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+
+import geo
+
 
+def _session_scope():
+    # one session per app context, which Flask pushes for every request
+    # whether the server runs it in a process, a thread or a greenlet, and
+    # removes when the context is torn down
+    return id(_app_ctx_stack.top)
 
-db = SQLAlchemy()
+
+db = SQLAlchemy(session_options={'scopefunc': _session_scope})
 
 
 #----------------------------------------------------------------------------#
 # Models.
 #----------------------------------------------------------------------------#
 
-class Show(db.Model):
+class Timestamped(object):
+    # UTC time of the last change to the row, or to another row shown on
+    # its page (see `touch`); set on every ORM or Core UPDATE of the row
+    updated_at = db.Column(db.DateTime, nullable=False, index=True,
+                           default=datetime.utcnow, onupdate=datetime.utcnow,
+                           server_default=db.text("(now() at time zone 'utc')"))
+
+    @classmethod
+    def touch(cls, ids):
+        """Mark the rows with the given ids as changed now."""
+        if ids:
+            db.session.execute(cls.__table__.update()
+                                 .where(cls.id.in_(list(ids)))
+                                 .values(updated_at=datetime.utcnow()))
+
+
+class Show(Timestamped, db.Model):
     __tablename__ = "shows"
+    __table_args__ = (
+        # serve the venue/artist relationship loads and the past/upcoming split
+        db.Index('ix_shows_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_shows_artist_id_start_time', 'artist_id', 'start_time'),
+        # the show listing and its date windows, in start time order; a BRIN
+        # index would be far smaller but cannot return rows in order, which
+        # every page needs (see bench/show_index.py)
+        db.Index('ix_shows_start_time_id', 'start_time', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    venue_id = db.Column(db.Integer, db.ForeignKey('venues.id'))
-    artist_id = db.Column(db.Integer, db.ForeignKey('artists.id'))
+    venue_id = db.Column(db.Integer, db.ForeignKey('venues.id', ondelete='CASCADE'), nullable=False)
+    artist_id = db.Column(db.Integer, db.ForeignKey('artists.id', ondelete='CASCADE'), nullable=False)
     start_time = db.Column(db.DateTime, nullable=False)
-    #venue: relationship to 'Venue', backref name 'shows_venue’, cascade='all, delete', lazy = 'joined'
-    #artist: relationship to 'Artist', backref name to 'shows_artist’, cascade='all, delete', lazy = 'joined'
-    showvenue = db.relationship('Venue', backref='shows_venue', cascade='all, delete', lazy = 'joined')
-    showartist = db.relationship('Artist', backref='shows_artist', cascade='all, delete', lazy = 'joined')
+    # relationships are never loaded implicitly: a query that needs them
+    # asks with db.joinedload/db.selectinload, anything else raises
+    venue = db.relationship('Venue', back_populates='shows', lazy='raise')
+    artist = db.relationship('Artist', back_populates='shows', lazy='raise')
 
-class Venue(db.Model):
+class Venue(Timestamped, db.Model):
     __tablename__ = 'venues'
+    __table_args__ = (
+        # trigram index backing the case-insensitive substring search
+        db.Index('ix_venues_name_trgm', 'name',
+                 postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+        # serves the genre filters (genres @> ARRAY[...])
+        db.Index('ix_venues_genres', 'genres', postgresql_using='gin'),
+        # the /venues listing order and its keyset pages (see
+        # queries._venue_listing), on exactly the expressions it sorts by
+        db.Index('ix_venues_area', db.text("coalesce(state, '')"),
+                 db.text("coalesce(city, '')"), 'id'),
+        # geohash range scans for the nearby search, index-only since the
+        # coordinates and id come along
+        db.Index('ix_venues_geohash', 'geohash', 'latitude', 'longitude', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
@@ -32,24 +86,52 @@ class Venue(db.Model):
     facebook_link = db.Column(db.String(120))
 
     # DONE: implement any missing fields, as a database migration using Flask-Migrate
-    genres = db.Column(db.ARRAY(db.String), nullable=False)
+    genres = db.Column(postgresql.ARRAY(db.String), nullable=False)
     website_link = db.Column(db.String)
     seeking_talent = db.Column(db.Boolean)
     seeking_description = db.Column(db.String)
-    shows = db.relationship('Show', backref='venue', lazy='joined')
+    # maintained by counters.refresh_show_counts
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # optional location; the geohash of the coordinates is set on every
+    # write of the ORM and by bulk imports, None without coordinates
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    # compared byte by byte ("C" collation), the order of geo.covering's ranges
+    geohash = db.Column(db.String(geo.PRECISION, collation='C'))
+    # the database deletes the shows of a deleted venue (ON DELETE CASCADE)
+    shows = db.relationship('Show', back_populates='venue', lazy='raise',
+                            cascade='all, delete-orphan', passive_deletes=True)
 
     def __repr__(self):
       return f'<Venue {self.id} {self.name} {self.seeking_talent}>'
 
-class Artist(db.Model):
+def venue_geohash(latitude, longitude):
+    """The geohash stored for a venue at these coordinates, if any."""
+    if latitude is None or longitude is None:
+        return None
+    return geo.encode(latitude, longitude)
+
+@event.listens_for(Venue, 'before_insert')
+@event.listens_for(Venue, 'before_update')
+def _set_geohash(mapper, connection, venue):
+    venue.geohash = venue_geohash(venue.latitude, venue.longitude)
+
+class Artist(Timestamped, db.Model):
     __tablename__ = 'artists'
+    __table_args__ = (
+        db.Index('ix_artists_name_trgm', 'name',
+                 postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_artists_genres', 'genres', postgresql_using='gin'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
     phone = db.Column(db.String(120))
-    genres = db.Column(db.ARRAY(db.String), nullable=False)
+    genres = db.Column(postgresql.ARRAY(db.String), nullable=False)
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
 
@@ -57,8 +139,37 @@ class Artist(db.Model):
     website_link = db.Column(db.String)
     seeking_venue = db.Column(db.Boolean)
     seeking_description = db.Column(db.String)
-    shows = db.relationship('Show', backref='artist', lazy='joined')
+    # maintained by counters.refresh_show_counts
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # the database deletes the shows of a deleted artist (ON DELETE CASCADE)
+    shows = db.relationship('Show', back_populates='artist', lazy='raise',
+                            cascade='all, delete-orphan', passive_deletes=True)
     
     def __repr__(self):
       return f'<Artist {self.id} {self.name} {self.seeking_venue}>'
 
+class Deletion(db.Model):
+    """When rows were last deleted from a table. Listings have no row left
+    to carry the updated_at of a deleted one, so their versions read this
+    too (see queries._version)."""
+    __tablename__ = 'deletions'
+
+    table_name = db.Column(db.String(64), primary_key=True)
+    deleted_at = db.Column(db.DateTime, nullable=False)
+
+    @classmethod
+    def touch(cls, connection, table_name):
+        """Record a deletion from `table_name` now, on `connection`."""
+        statement = postgresql.insert(cls.__table__) \
+            .values(table_name=table_name, deleted_at=datetime.utcnow())
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[cls.table_name],
+            set_={'deleted_at': statement.excluded.deleted_at}
+        ))
+
+@event.listens_for(Venue, 'after_delete')
+@event.listens_for(Artist, 'after_delete')
+def _record_deletion(mapper, connection, target):
+    # every ORM delete of a venue or artist, and of the shows it cascades to
+    Deletion.touch(connection, mapper.local_table.name)
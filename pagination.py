@@ -0,0 +1,121 @@
+import base64
+import json
+from collections import namedtuple
+from datetime import datetime
+
+from models import db
+
+
+#----------------------------------------------------------------------------#
+# Keyset pagination.
+#----------------------------------------------------------------------------#
+
+# items: the rows of this page
+# next_cursor / prev_cursor: opaque tokens for the neighbouring pages, or
+# None when there is nothing in that direction
+Page = namedtuple('Page', ['items', 'next_cursor', 'prev_cursor'])
+
+
+def encode_cursor(values):
+    """Pack the sort key of a row into an opaque, URL-safe token."""
+    raw = json.dumps(list(values), default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(token, columns=None):
+    """Unpack a token made by `encode_cursor`.
+
+    Returns None for a missing or malformed token, which callers treat as
+    a request for the first page. Given the sort `columns`, a token must
+    also hold one value of each column's type, so a crafted one never
+    reaches the database; datetimes are read back from their strings.
+    """
+    if not token:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list):
+        return None
+    if columns is not None:
+        if len(values) != len(columns):
+            return None
+        try:
+            values = [_typed(value, column) for value, column in zip(values, columns)]
+        except (ValueError, TypeError):
+            return None
+    return values
+
+
+def _typed(value, column):
+    """`value` as a value of `column`, or ValueError / TypeError."""
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is int:
+        # JSON true and false are ints to Python
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise TypeError(value)
+        return value
+    if python_type is str:
+        # PostgreSQL text cannot hold NUL
+        if not isinstance(value, str) or '\x00' in value:
+            raise TypeError(value)
+        return value
+    raise TypeError(python_type)
+
+
+def keyset_page(query, columns, after=None, before=None, page_size=20):
+    """Fetch one page of `query` ordered by `columns`.
+
+    `columns` must uniquely order the rows (end with a primary key) and be
+    selected by the query under their own keys, so the cursor of a row can
+    be read back from it. Pages are located with a row-value comparison on
+    the sort key rather than OFFSET, so page N costs the same as page 1.
+    """
+    sort_key = db.tuple_(*columns)
+    after = decode_cursor(after, columns)
+    before = decode_cursor(before, columns) if after is None else None
+
+    if before is not None:
+        rows = query.filter(sort_key < db.tuple_(*before)) \
+                    .order_by(*[column.desc() for column in columns]) \
+                    .limit(page_size + 1) \
+                    .all()
+        has_prev = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        has_next = True
+    else:
+        if after is not None:
+            query = query.filter(sort_key > db.tuple_(*after))
+        rows = query.order_by(*columns).limit(page_size + 1).all()
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        has_prev = after is not None
+
+    return Page(
+        items=rows,
+        next_cursor=encode_cursor(sort_key_of(rows[-1], columns)) if rows and has_next else None,
+        prev_cursor=encode_cursor(sort_key_of(rows[0], columns)) if rows and has_prev else None
+    )
+
+
+def keyset_iter(query, columns, after=None, limit=None, batch_size=1000):
+    """Iterate over `query` ordered by `columns`, starting after a cursor.
+
+    Rows are read from a server-side cursor `batch_size` at a time, so the
+    whole result is never held in memory.
+    """
+    after = decode_cursor(after, columns)
+    if after is not None:
+        query = query.filter(db.tuple_(*columns) > db.tuple_(*after))
+    query = query.order_by(*columns)
+    if limit is not None:
+        query = query.limit(limit)
+    return query.yield_per(batch_size)
+
+
+def sort_key_of(row, columns):
+    """The values of `columns` in a row, as accepted by `encode_cursor`."""
+    return tuple(getattr(row, column.key) for column in columns)
@@ -0,0 +1,176 @@
+import sys
+import threading
+import time
+
+import psycopg2
+from psycopg2 import extensions
+from sqlalchemy import event, exc
+from sqlalchemy.pool import NullPool, QueuePool
+
+from models import db
+
+
+#----------------------------------------------------------------------------#
+# Connection pool configuration and statistics.
+#----------------------------------------------------------------------------#
+
+class _TimedCheckout(object):
+    """Pool mixin counting checkouts and the time spent getting a
+    connection, which includes waiting for one to be returned when the
+    pool is exhausted and opening new ones."""
+
+    def __init__(self, *args, **kwargs):
+        super(_TimedCheckout, self).__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super(_TimedCheckout, self)._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedNullPool(_TimedCheckout, NullPool):
+    pass
+
+
+def _session_settings(config):
+    settings = {}
+    if config['DB_STATEMENT_TIMEOUT_MS']:
+        settings['statement_timeout'] = config['DB_STATEMENT_TIMEOUT_MS']
+    if config['DB_LOCK_TIMEOUT_MS']:
+        settings['lock_timeout'] = config['DB_LOCK_TIMEOUT_MS']
+    return settings
+
+
+def _session_options(settings):
+    return ' '.join('-c {}={}'.format(name, value) for name, value in settings.items())
+
+
+def engine_options(config):
+    """SQLAlchemy engine options for the DB_* settings of `config`.
+
+    In PgBouncer transaction pooling mode, PgBouncer owns the pool, so the
+    app opens a connection per checkout, and session settings are applied
+    with SET LOCAL at the start of each transaction because a server
+    connection only belongs to the client for that long.
+    """
+    options = {'pool_pre_ping': config['DB_POOL_PRE_PING']}
+    settings = _session_settings(config)
+    if config['DB_PGBOUNCER']:
+        options['poolclass'] = TimedNullPool
+    else:
+        options.update(
+            poolclass=TimedQueuePool,
+            pool_size=config['DB_POOL_SIZE'],
+            max_overflow=config['DB_MAX_OVERFLOW'],
+            pool_timeout=config['DB_POOL_TIMEOUT'],
+            pool_recycle=config['DB_POOL_RECYCLE']
+        )
+        if settings:
+            options['connect_args'] = {'options': _session_options(settings)}
+    return options
+
+
+def _set_local(settings):
+    statement = ';'.join('SET LOCAL {} = {}'.format(name, int(value))
+                         for name, value in settings.items())
+
+    def on_begin(conn):
+        # on the DBAPI connection, so it is not counted as a statement of
+        # the request
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(statement)
+        finally:
+            cursor.close()
+    return on_begin
+
+
+def _gevent_wait(conn, timeout=None):
+    from gevent.socket import wait_read, wait_write
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            return
+        elif state == extensions.POLL_READ:
+            wait_read(conn.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(conn.fileno(), timeout=timeout)
+        else:
+            raise psycopg2.OperationalError('Bad result from poll: {!r}'.format(state))
+
+
+def _gevent_patched():
+    monkey = sys.modules.get('gevent.monkey')
+    return monkey is not None and monkey.is_module_patched('socket')
+
+
+def init_db_pool(app):
+    """Configure the `models.db` engine of `app` from its DB_* settings.
+
+    Must run before anything creates the engine. Under gevent workers,
+    psycopg2 waits for the database by yielding to other greenlets
+    instead of blocking the whole worker.
+    """
+    if _gevent_patched():
+        extensions.set_wait_callback(_gevent_wait)
+
+    app.config.setdefault('DB_POOL_SIZE', 5)
+    app.config.setdefault('DB_MAX_OVERFLOW', 10)
+    app.config.setdefault('DB_POOL_TIMEOUT', 30)
+    app.config.setdefault('DB_POOL_RECYCLE', 1800)
+    app.config.setdefault('DB_POOL_PRE_PING', True)
+    app.config.setdefault('DB_STATEMENT_TIMEOUT_MS', 0)
+    app.config.setdefault('DB_LOCK_TIMEOUT_MS', 0)
+    app.config.setdefault('DB_PGBOUNCER', False)
+
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    options.update(engine_options(app.config))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+    settings = _session_settings(app.config)
+    if app.config['DB_PGBOUNCER'] and settings:
+        event.listen(db.get_engine(app), 'begin', _set_local(settings))
+
+
+def pool_stats(engine):
+    """Live statistics of the pool of `engine`."""
+    pool = engine.pool
+    stats = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow
+        )
+    if isinstance(pool, _TimedCheckout):
+        with pool._stats_lock:
+            stats.update(
+                checkouts=pool.checkouts,
+                timeouts=pool.timeouts,
+                wait_time_total_ms=round(pool.wait_total * 1000, 1),
+                wait_time_avg_ms=round(pool.wait_total * 1000 / pool.checkouts, 3)
+                                 if pool.checkouts else 0.0,
+                wait_time_max_ms=round(pool.wait_max * 1000, 1)
+            )
+    return stats
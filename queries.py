@@ -0,0 +1,561 @@
+from datetime import datetime
+from itertools import groupby
+
+import geo
+from cache import ResponseCache
+from enums import Genre
+from models import db, Venue, Artist, Show, Deletion
+from pagination import keyset_page, keyset_iter, sort_key_of
+
+
+#----------------------------------------------------------------------------#
+# Helpers.
+#----------------------------------------------------------------------------#
+
+# searches count their matches up to this many; past it, 'count_capped' is set
+SEARCH_COUNT_LIMIT = 1000
+
+# genre facet counts by (table, selected genres, listing version); a write
+# changes the version, so entries are never stale, only left to expire
+facet_cache = ResponseCache(maxsize=256, ttl=3600)
+
+
+def _contains_pattern(term):
+    """Build an ILIKE pattern matching `term` anywhere, with wildcards escaped."""
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return '%' + escaped + '%'
+
+
+def _iter_items(query, columns, item, after, limit):
+    for row in keyset_iter(query, columns, after, limit):
+        yield sort_key_of(row, columns), item(row)
+
+
+def _with_genres(query, model, genres):
+    """Keep the rows of `model` listing every genre in `genres`.
+
+    The containment test is served by the GIN index on the genres column.
+    """
+    if genres:
+        query = query.filter(model.genres.contains(list(genres)))
+    return query
+
+
+def _in_window(query, start=None, end=None):
+    """Keep the shows starting at or after `start` and before `end`, either
+    bound optional. Served by the (start_time, id) index on shows, or by
+    the (venue_id, start_time) and (artist_id, start_time) ones for the
+    shows of one venue or artist."""
+    if start is not None:
+        query = query.filter(Show.start_time >= start)
+    if end is not None:
+        query = query.filter(Show.start_time < end)
+    return query
+
+
+def _genre_facets(model, genres, version):
+    """Count, for each genre, the rows of `model` having it among those
+    matching the `genres` filter, in one query.
+
+    Returns an entry for each genre with at least one row and for each
+    selected genre, in enum order. The counts read the whole table, so
+    they are kept in `facet_cache` under the listing `version` and only
+    counted again once it changes.
+    """
+    key = (model.__tablename__, tuple(sorted(genres)), version)
+    facets = facet_cache.get(key)
+    if facets is None:
+        facets = _count_genres(model, genres)
+        facet_cache.set(key, facets)
+    return facets
+
+
+def _count_genres(model, genres):
+    genre = db.func.unnest(model.genres).label('genre')
+    tagged = _with_genres(db.session.query(genre), model, genres).subquery()
+    counts = dict(db.session.query(tagged.c.genre, db.func.count())
+                            .group_by(tagged.c.genre))
+    return [{
+        'genre': choice.name,
+        'label': choice.value,
+        'count': counts.get(choice.name, 0),
+        'selected': choice.name in genres
+    } for choice in Genre if choice.name in counts or choice.name in genres]
+
+
+def _search_result(query, order_by, item, limit):
+    """The first `limit` rows of a search, and how many rows match, counted
+    up to SEARCH_COUNT_LIMIT so neither grows with the table."""
+    rows = query.order_by(*order_by).limit(limit).all()
+    count = len(rows)
+    if count == limit:
+        matches = query.with_entities(db.literal(1)).limit(SEARCH_COUNT_LIMIT).subquery()
+        count = max(count, db.session.query(db.func.count()).select_from(matches).scalar())
+    return {
+        'count': count,
+        'count_capped': count >= SEARCH_COUNT_LIMIT,
+        'data': [item(row) for row in rows]
+    }
+
+
+def _search(model, term, genres=(), limit=50):
+    """Case-insensitive substring search on `model.name`, best matches first.
+
+    The ILIKE filter is served by the trigram index on the name column and
+    the upcoming show count is read from the stored counter.
+    """
+    query = db.session.query(
+        model.id,
+        model.name,
+        model.upcoming_shows_count.label('num_upcoming_shows')
+    ).filter(model.name.ilike(_contains_pattern(term), escape='\\'))
+    query = _with_genres(query, model, genres)
+
+    def item(row):
+        return {
+            'id': row.id,
+            'name': row.name,
+            'num_upcoming_shows': row.num_upcoming_shows
+        }
+
+    order_by = [db.func.similarity(model.name, term).desc(), model.name]
+    return _search_result(query, order_by, item, limit)
+
+
+def _version(latest, deleted):
+    """The newest updated_at of the `latest` models and the last deletion
+    from the tables of the `deleted` ones, in one statement. The maxima
+    are read from the updated_at indexes, the deletions by primary key
+    from the deletions table.
+    """
+    columns = [db.select([db.func.max(model.updated_at)]).as_scalar() for model in latest]
+    columns += [db.select([Deletion.deleted_at])
+                  .where(Deletion.table_name == model.__tablename__)
+                  .as_scalar() for model in deleted]
+    row = db.session.query(*columns).one()
+    stamps = [stamp for stamp in row if stamp is not None]
+    return (max(stamps) if stamps else None), tuple(row)
+
+
+#----------------------------------------------------------------------------#
+# Venues.
+#----------------------------------------------------------------------------#
+
+def _venue_listing(genres=()):
+    state = db.func.coalesce(Venue.state, '').label('state')
+    city = db.func.coalesce(Venue.city, '').label('city')
+    query = db.session.query(
+        Venue.id,
+        Venue.name,
+        city,
+        state,
+        Venue.upcoming_shows_count.label('num_upcoming_shows'),
+        Venue.updated_at
+    )
+    return _with_genres(query, Venue, genres), [state, city, Venue.id]
+
+
+def _venue_item(row):
+    return {
+        'id': row.id,
+        'name': row.name,
+        'num_upcoming_shows': row.num_upcoming_shows,
+        'updated_at': row.updated_at
+    }
+
+
+def venue_areas(after=None, before=None, page_size=20, genres=()):
+    """List venues grouped by city and state with their upcoming show counts,
+    optionally only those with all of `genres`.
+
+    Returns a Page whose items are the areas. The page is built from one
+    query ordered by location, so the rows can be grouped into areas in a
+    single pass; an area may continue onto the next page.
+    """
+    query, columns = _venue_listing(genres)
+    page = keyset_page(query, columns, after, before, page_size)
+
+    areas = []
+    for (area_state, area_city), venues in groupby(page.items, key=lambda row: (row.state, row.city)):
+        areas.append({
+            'city': area_city,
+            'state': area_state,
+            'venues': [_venue_item(venue) for venue in venues]
+        })
+    return page._replace(items=areas)
+
+
+def iter_venues(after=None, limit=None, genres=()):
+    """Yield (sort key, venue) pairs in listing order, streamed from the
+    database."""
+    query, columns = _venue_listing(genres)
+    def item(row):
+        return dict(_venue_item(row), city=row.city, state=row.state)
+    return _iter_items(query, columns, item, after, limit)
+
+
+def search_venues(term, genres=(), limit=50):
+    """Search venues by partial, case-insensitive name."""
+    return _search(Venue, term, genres, limit)
+
+
+def venue_genre_facets(genres=(), version=None):
+    """Per-genre venue counts for the venue listing filtered by `genres`.
+
+    `version` is the listing's venues_version(), when the caller has
+    computed it already.
+    """
+    return _genre_facets(Venue, genres, version or venues_version())
+
+
+# first search an area this many times narrower (see nearby_venues)
+NEARBY_NARROWING = 8
+
+# A fixed statement, so it is neither rebuilt nor recompiled per search.
+# The candidates come from index-only scans of ix_venues_geohash, one per
+# hash range, which hold the coordinates; only the nearest `limit` are
+# then read from the table. MATERIALIZED keeps the planner from trading
+# the range scans for a scan of the whole table sorted by distance.
+_NEARBY_VENUES = db.text("""
+WITH candidates AS MATERIALIZED (
+    SELECT venues.id,
+           2 * :earth_radius * asin(sqrt(least(1.0,
+               power(sin(radians(venues.latitude - :latitude) / 2), 2) +
+               cos(radians(:latitude)) * cos(radians(venues.latitude)) *
+               power(sin(radians(venues.longitude - :longitude) / 2), 2)))) AS distance
+    FROM unnest(CAST(:lows AS text[]), CAST(:highs AS text[])) AS cell (low, high)
+    JOIN venues ON venues.geohash >= cell.low AND venues.geohash < cell.high
+), nearest AS (
+    SELECT id, distance FROM candidates
+    WHERE distance <= :radius
+    ORDER BY distance, id
+    LIMIT :limit
+)
+SELECT venues.id, venues.name, venues.city, venues.state, venues.address,
+       venues.latitude, venues.longitude,
+       venues.upcoming_shows_count AS num_upcoming_shows, nearest.distance
+FROM nearest JOIN venues ON venues.id = nearest.id
+ORDER BY nearest.distance, venues.id
+""")
+
+
+def nearby_venues(latitude, longitude, radius, limit=20):
+    """The venues within `radius` km of a point, nearest first, with their
+    distance in km (haversine, as `geo.distance`) and upcoming show count.
+
+    Candidates are the venues in the few geohash ranges covering the
+    circle (see `geo.covering`), or every located venue where no small
+    covering exists; only they have their distance computed and sorted.
+    Where venues are dense, a circle an eighth as wide already holds the
+    nearest `limit` and is searched first.
+    """
+    def search(within):
+        ranges = geo.covering(latitude, longitude, within) or [('', geo.END)]
+        return db.session.execute(_NEARBY_VENUES, {
+            'earth_radius': geo.EARTH_RADIUS_KM,
+            'latitude': latitude,
+            'longitude': longitude,
+            'radius': within,
+            'limit': limit,
+            'lows': [low for low, _ in ranges],
+            'highs': [high for _, high in ranges]
+        }).fetchall()
+
+    rows = search(radius / NEARBY_NARROWING)
+    if len(rows) < limit:
+        rows = search(radius)
+
+    data = [{
+        'id': row.id,
+        'name': row.name,
+        'city': row.city,
+        'state': row.state,
+        'address': row.address,
+        'latitude': row.latitude,
+        'longitude': row.longitude,
+        'distance': round(row.distance, 3),
+        'num_upcoming_shows': row.num_upcoming_shows
+    } for row in rows]
+    return {'count': len(data), 'data': data}
+
+
+def venue_detail(venue_id, start=None, end=None):
+    """Load one venue and its shows for the venue page, only those starting
+    between `start` and `end` when given.
+
+    Returns None when no venue has the given id.
+    """
+    venue = Venue.query.get(venue_id)
+    if venue is None:
+        return None
+
+    upcoming = (Show.start_time > datetime.now()).label('upcoming')
+    shows = db.session.query(
+        Show.artist_id,
+        Artist.name,
+        Artist.image_link,
+        Show.start_time,
+        upcoming
+    ).join(Artist, Show.artist_id == Artist.id) \
+     .filter(Show.venue_id == venue_id)
+    shows = _in_window(shows, start, end).order_by(Show.start_time).all()
+
+    past_shows = []
+    upcoming_shows = []
+    for artist_id, artist_name, artist_image_link, start_time, is_upcoming in shows:
+        entry = {
+            'artist_id': artist_id,
+            'artist_name': artist_name,
+            'artist_image_link': artist_image_link,
+            'start_time': start_time
+        }
+        if is_upcoming:
+            upcoming_shows.append(entry)
+        else:
+            past_shows.append(entry)
+
+    return {
+        'id': venue.id,
+        'name': venue.name,
+        'genres': venue.genres,
+        'address': venue.address,
+        'city': venue.city,
+        'state': venue.state,
+        'phone': venue.phone,
+        'website': venue.website_link,
+        'facebook_link': venue.facebook_link,
+        'seeking_talent': venue.seeking_talent,
+        'seeking_description': venue.seeking_description,
+        'image_link': venue.image_link,
+        'latitude': venue.latitude,
+        'longitude': venue.longitude,
+        'past_shows': past_shows,
+        'upcoming_shows': upcoming_shows,
+        'past_shows_count': len(past_shows),
+        'upcoming_shows_count': len(upcoming_shows)
+    }
+
+
+def venue_version(venue_id):
+    """(when the venue page last changed, venue id), or None when there is no
+    such venue. Reads the venue row only, none of its shows."""
+    return db.session.query(Venue.updated_at, Venue.id).filter(Venue.id == venue_id).first()
+
+
+def venues_version():
+    """(when the venue listing last changed, fingerprint of its rows)."""
+    return _version([Venue], [Venue])
+
+
+def venue_artist_ids(venue_id):
+    """Ids of the artists with a show at the venue."""
+    rows = db.session.query(Show.artist_id) \
+                     .filter(Show.venue_id == venue_id) \
+                     .distinct()
+    return [artist_id for artist_id, in rows]
+
+
+#----------------------------------------------------------------------------#
+# Artists.
+#----------------------------------------------------------------------------#
+
+def _artist_listing(genres=()):
+    query = db.session.query(Artist.id, Artist.name, Artist.updated_at)
+    return _with_genres(query, Artist, genres), [Artist.id]
+
+
+def _artist_item(row):
+    return {
+        'id': row.id,
+        'name': row.name,
+        'updated_at': row.updated_at
+    }
+
+
+def list_artists(after=None, before=None, page_size=20, genres=()):
+    """List artists in id order, one page at a time, optionally only those
+    with all of `genres`."""
+    query, columns = _artist_listing(genres)
+    page = keyset_page(query, columns, after, before, page_size)
+    return page._replace(items=[_artist_item(artist) for artist in page.items])
+
+
+def iter_artists(after=None, limit=None, genres=()):
+    """Yield (sort key, artist) pairs in listing order, streamed from the
+    database."""
+    query, columns = _artist_listing(genres)
+    return _iter_items(query, columns, _artist_item, after, limit)
+
+
+def search_artists(term, genres=(), limit=50):
+    """Search artists by partial, case-insensitive name."""
+    return _search(Artist, term, genres, limit)
+
+
+def artist_genre_facets(genres=(), version=None):
+    """Per-genre artist counts for the artist listing filtered by `genres`.
+
+    `version` is the listing's artists_version(), when the caller has
+    computed it already.
+    """
+    return _genre_facets(Artist, genres, version or artists_version())
+
+
+def artist_detail(artist_id, start=None, end=None):
+    """Load one artist and their shows for the artist page, only those
+    starting between `start` and `end` when given.
+
+    Issues two statements regardless of how many shows the artist has.
+    Returns None when no artist has the given id.
+    """
+    artist = Artist.query.get(artist_id)
+    if artist is None:
+        return None
+
+    upcoming = (Show.start_time > datetime.now()).label('upcoming')
+    shows = db.session.query(
+        Show.venue_id,
+        Venue.name,
+        Venue.image_link,
+        Show.start_time,
+        upcoming
+    ).join(Venue, Show.venue_id == Venue.id) \
+     .filter(Show.artist_id == artist_id)
+    shows = _in_window(shows, start, end).order_by(Show.start_time).all()
+
+    past_shows = []
+    upcoming_shows = []
+    for venue_id, venue_name, venue_image_link, start_time, is_upcoming in shows:
+        entry = {
+            'venue_id': venue_id,
+            'venue_name': venue_name,
+            'venue_image_link': venue_image_link,
+            'start_time': start_time
+        }
+        if is_upcoming:
+            upcoming_shows.append(entry)
+        else:
+            past_shows.append(entry)
+
+    return {
+        'id': artist.id,
+        'name': artist.name,
+        'genres': artist.genres,
+        'city': artist.city,
+        'state': artist.state,
+        'phone': artist.phone,
+        'website': artist.website_link,
+        'facebook_link': artist.facebook_link,
+        'seeking_venue': artist.seeking_venue,
+        'seeking_description': artist.seeking_description,
+        'image_link': artist.image_link,
+        'past_shows': past_shows,
+        'upcoming_shows': upcoming_shows,
+        'past_shows_count': len(past_shows),
+        'upcoming_shows_count': len(upcoming_shows)
+    }
+
+
+def artist_version(artist_id):
+    """(when the artist page last changed, artist id), or None when there is no
+    such artist. Reads the artist row only, none of its shows."""
+    return db.session.query(Artist.updated_at, Artist.id).filter(Artist.id == artist_id).first()
+
+
+def artists_version():
+    """(when the artist listing last changed, fingerprint of its rows)."""
+    return _version([Artist], [Artist])
+
+
+def artist_venue_ids(artist_id):
+    """Ids of the venues where the artist has a show."""
+    rows = db.session.query(Show.venue_id) \
+                     .filter(Show.artist_id == artist_id) \
+                     .distinct()
+    return [venue_id for venue_id, in rows]
+
+
+#----------------------------------------------------------------------------#
+# Shows.
+#----------------------------------------------------------------------------#
+
+def _show_listing(start=None, end=None):
+    query = db.session.query(
+        Show.id,
+        Show.start_time,
+        Venue.id.label('venue_id'),
+        Venue.name.label('venue_name'),
+        Artist.id.label('artist_id'),
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link'),
+        # a show row shows names and images of its venue and artist too
+        db.func.greatest(Show.updated_at, Venue.updated_at, Artist.updated_at).label('updated_at')
+    ).join(Venue, Show.venue_id == Venue.id) \
+     .join(Artist, Show.artist_id == Artist.id)
+    return _in_window(query, start, end), [Show.start_time, Show.id]
+
+
+def _show_item(row):
+    return {
+        'id': row.id,
+        'venue_id': row.venue_id,
+        'venue_name': row.venue_name,
+        'artist_id': row.artist_id,
+        'artist_name': row.artist_name,
+        'artist_image_link': row.artist_image_link,
+        'start_time': row.start_time,
+        'updated_at': row.updated_at
+    }
+
+
+def list_shows(after=None, before=None, page_size=20, start=None, end=None):
+    """List shows with their venue and artist by start time, one page at a
+    time, only those starting between `start` and `end` when given."""
+    query, columns = _show_listing(start, end)
+    page = keyset_page(query, columns, after, before, page_size)
+    return page._replace(items=[_show_item(show) for show in page.items])
+
+
+def iter_shows(after=None, limit=None, start=None, end=None):
+    """Yield (sort key, show) pairs in listing order, streamed from the
+    database."""
+    query, columns = _show_listing(start, end)
+    return _iter_items(query, columns, _show_item, after, limit)
+
+
+def show_rows(start=None, end=None, venue_id=None, batch_size=1000):
+    """Yield the rows of the show listing in its order, only those starting
+    between `start` and `end` and at one venue when given, read from a
+    server-side cursor `batch_size` at a time."""
+    query, columns = _show_listing(start, end)
+    if venue_id is not None:
+        query = query.filter(Show.venue_id == venue_id)
+    return keyset_iter(query, columns, batch_size=batch_size)
+
+
+def shows_version():
+    """(when the show listing last changed, fingerprint of its rows).
+
+    Shows are only deleted along with their venue or artist, whose
+    deletions are recorded, so deletions from shows are not looked up.
+    """
+    return _version([Show, Venue, Artist], [Venue, Artist])
+
+
+def show_detail(show_id):
+    """Load one show with its venue and artist, or None."""
+    query, _ = _show_listing()
+    row = query.filter(Show.id == show_id).first()
+    return _show_item(row) if row is not None else None
+
+
+def search_shows(term, limit=50):
+    """Search shows by partial, case-insensitive artist or venue name, by
+    start time."""
+    pattern = _contains_pattern(term)
+    query, columns = _show_listing()
+    query = query.filter(db.or_(
+        Artist.name.ilike(pattern, escape='\\'),
+        Venue.name.ilike(pattern, escape='\\')
+    ))
+    return _search_result(query, columns, _show_item, limit)
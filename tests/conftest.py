@@ -0,0 +1,84 @@
+"""Fixtures for the tests that need a database.
+
+They run against TEST_DATABASE_URL, whose tables are created at the start
+of the session and dropped at the end, and are skipped when it is unset:
+
+    TEST_DATABASE_URL=postgresql://testuser@localhost:5432/fyyur_test python -m pytest
+"""
+import os
+
+import pytest
+from sqlalchemy import event, exc
+
+import config
+from app import create_app
+from models import db
+
+
+class TestConfig(object):
+    pass
+
+
+for name in dir(config):
+    if name.isupper():
+        setattr(TestConfig, name, getattr(config, name))
+TestConfig.TESTING = True
+TestConfig.DEBUG = True
+TestConfig.SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL')
+TestConfig.RESPONSE_CACHE_ENABLED = False
+TestConfig.FRAGMENT_CACHE_ENABLED = False
+TestConfig.WTF_CSRF_ENABLED = False
+
+
+def _create_schema():
+    """Create every table, without the trigram indexes when the server
+    lacks pg_trgm: they only speed up the name searches."""
+    trigram = []
+    try:
+        db.session.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        db.session.commit()
+    except exc.DBAPIError:
+        db.session.rollback()
+        trigram = [(table, index) for table in db.metadata.sorted_tables for index in table.indexes
+                   if 'gin_trgm_ops' in (index.dialect_options['postgresql']['ops'] or {}).values()]
+    for table, index in trigram:
+        table.indexes.discard(index)
+    try:
+        db.create_all()
+    finally:
+        for table, index in trigram:
+            table.indexes.add(index)
+
+
+@pytest.fixture(scope='session')
+def app():
+    if not TestConfig.SQLALCHEMY_DATABASE_URI:
+        pytest.skip('TEST_DATABASE_URL is not set')
+    app = create_app(TestConfig)
+    with app.app_context():
+        _create_schema()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def session(app):
+    """db.session, with every table emptied after the test."""
+    yield db.session
+    db.session.rollback()
+    db.session.execute('TRUNCATE shows, venues, artists, deletions RESTART IDENTITY CASCADE')
+    db.session.commit()
+
+
+@pytest.fixture
+def statements(app):
+    """The SQL statements run while the test runs, in order."""
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    yield captured
+    event.remove(db.engine, 'before_cursor_execute', capture)
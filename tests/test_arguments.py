@@ -0,0 +1,63 @@
+from datetime import datetime
+
+import pytest
+from flask import Flask
+from werkzeug.datastructures import MultiDict
+
+from arguments import genre_args, location_args, time_arg
+
+
+@pytest.mark.parametrize('name, value, expected', [
+    ('from', '2021-05-21', datetime(2021, 5, 21)),
+    # a date alone includes that day, as a date input's "to" reads
+    ('to', '2021-05-23', datetime(2021, 5, 24)),
+    ('to', '2021-05-23T18:00', datetime(2021, 5, 23, 18)),
+    ('to', '2021-05-23 00:00', datetime(2021, 5, 23)),
+])
+def test_time_arg(name, value, expected):
+    assert time_arg({name: value}, name) == expected
+
+
+def test_time_arg_missing():
+    assert time_arg({}, 'to') is None
+    assert time_arg({'to': ''}, 'to') is None
+
+
+def test_time_arg_invalid():
+    with pytest.raises(ValueError, match='invalid to time'):
+        time_arg({'to': 'someday'}, 'to')
+
+
+def test_genre_args():
+    args = MultiDict([('genre', 'Jazz'), ('genre', 'Polka'), ('genre', 'Blues')])
+    assert genre_args(args) == ['Jazz', 'Blues']
+
+
+@pytest.fixture
+def config():
+    app = Flask(__name__)
+    app.config.update(NEARBY_RADIUS_KM=10, NEARBY_MAX_RADIUS_KM=100)
+    with app.app_context():
+        yield app.config
+
+
+@pytest.mark.parametrize('query, expected', [
+    ({}, None),
+    ({'lat': '40.7', 'lng': '-74'}, (40.7, -74, 10)),
+    ({'lat': '40.7', 'lng': '-74', 'radius': '2.5'}, (40.7, -74, 2.5)),
+])
+def test_location_args(config, query, expected):
+    assert location_args(MultiDict(query)) == expected
+
+
+@pytest.mark.parametrize('query, message', [
+    ({}, 'lat and lng are required'),
+    ({'lat': '40.7'}, 'lat and lng are required'),
+    ({'lat': 'north', 'lng': '-74'}, 'lat and lng are required'),
+    ({'lat': '91', 'lng': '-74'}, 'invalid lat, lng or radius'),
+    ({'lat': '40.7', 'lng': '-74', 'radius': '0'}, 'invalid lat, lng or radius'),
+    ({'lat': '40.7', 'lng': '-74', 'radius': '101'}, 'invalid lat, lng or radius'),
+])
+def test_location_args_invalid(config, query, message):
+    with pytest.raises(ValueError, match=message):
+        location_args(MultiDict(query), required=True)
@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import Artist, Show, Venue
+from queries import artist_detail
+
+
+def _artist_with_shows(session, count):
+    venue = Venue(name='The Musical Hop', city='San Francisco', state='CA', genres=['Jazz'])
+    artist = Artist(name='Guns N Petals', city='San Francisco', state='CA', genres=['Rock n Roll'])
+    session.add_all([venue, artist])
+    session.flush()
+    start = datetime.now() - timedelta(days=count // 2)
+    session.execute(Show.__table__.insert(), [
+        {'venue_id': venue.id, 'artist_id': artist.id, 'start_time': start + timedelta(days=day)}
+        for day in range(count)
+    ])
+    session.commit()
+    return artist.id
+
+
+@pytest.mark.parametrize('count', [1, 10000])
+def test_statement_count_does_not_grow_with_shows(session, statements, count):
+    artist_id = _artist_with_shows(session, count)
+    session.expire_all()
+    del statements[:]
+
+    artist = artist_detail(artist_id)
+
+    assert len(artist['past_shows']) + len(artist['upcoming_shows']) == count
+    assert len(statements) == 2
+
+
+def test_missing_artist(session, statements):
+    assert artist_detail(1) is None
+    assert len(statements) == 1
@@ -0,0 +1,33 @@
+import io
+
+from bulk_import import MalformedRecord, import_records, read_records
+from models import Artist
+
+LINES = '\n'.join([
+    '{"name": "Guns N Petals", "city": "San Francisco", "state": "CA", "phone": "326-123-5000", "genres": ["Rock_n_Roll"]}',
+    '{"name": broken',
+    '[1, 2]',
+    '{"name": "The Wild Sax Band", "city": "San Francisco", "state": "CA", "phone": "432-325-5432", "genres": "Jazz"}',
+])
+
+
+def test_malformed_ndjson_line_is_read_as_malformed_record():
+    records = list(read_records(io.StringIO(LINES), 'ndjson'))
+
+    assert [number for number, _ in records] == [1, 2, 3, 4]
+    assert isinstance(records[1][1], MalformedRecord)
+    assert records[2][1] == [1, 2]
+
+
+def test_malformed_lines_are_rejected_and_the_import_goes_on(session):
+    rejects = []
+
+    imported, rejected, _ = import_records(
+        'artists', read_records(io.StringIO(LINES), 'ndjson'), batch_size=2,
+        on_reject=lambda line, errors: rejects.append((line, errors))
+    )
+
+    assert (imported, rejected) == (2, 2)
+    assert [line for line, _ in rejects] == [2, 3]
+    assert all('record' in errors for _, errors in rejects)
+    assert {artist.name for artist in Artist.query} == {'Guns N Petals', 'The Wild Sax Band'}
@@ -0,0 +1,70 @@
+import pytest
+from flask import Request
+from werkzeug.http import http_date
+
+from models import Venue
+
+
+def _venue(session, name='The Musical Hop'):
+    venue = Venue(name=name, city='San Francisco', state='CA', genres=['Jazz'])
+    session.add(venue)
+    session.commit()
+    return venue.id
+
+
+def test_listing_is_not_modified_until_a_venue_is_deleted(app, session):
+    client = app.test_client()
+    # the older venue, whose deletion leaves the newest updated_at as it is
+    venue_id = _venue(session)
+    _venue(session, 'Park Square Live Music & Coffee')
+
+    etag = client.get('/venues').headers['ETag']
+    assert client.get('/venues', headers={'If-None-Match': etag}).status_code == 304
+
+    client.delete('/venues/{}'.format(venue_id))
+    # a new client, without the flash message the delete left in the session
+    response = app.test_client().get('/venues', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_listing_version_does_not_count_rows(app, session, statements):
+    client = app.test_client()
+    _venue(session)
+    etag = client.get('/venues').headers['ETag']
+    del statements[:]
+
+    assert client.get('/venues', headers={'If-None-Match': etag}).status_code == 304
+    assert len(statements) == 1
+    assert 'count(' not in statements[0].lower()
+
+
+def test_etag_changes_with_the_build(app, session):
+    client = app.test_client()
+    _venue(session)
+    etag = client.get('/venues').headers['ETag']
+
+    build_id = app.extensions.pop('build_id')
+    app.config['BUILD_ID'] = 'next-release'
+    try:
+        response = client.get('/venues', headers={'If-None-Match': etag})
+    finally:
+        app.config['BUILD_ID'] = None
+        app.extensions['build_id'] = build_id
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+@pytest.mark.parametrize('naive', [False, True])
+def test_if_modified_since(app, session, monkeypatch, naive):
+    client = app.test_client()
+    _venue(session)
+    response = client.get('/venues')
+    last_modified = response.last_modified
+    if naive:
+        # Werkzeug before 2.0 parses HTTP dates into naive datetimes
+        parsed = last_modified.replace(tzinfo=None)
+        monkeypatch.setattr(Request, 'if_modified_since', property(lambda request: parsed))
+
+    response = client.get('/venues', headers={'If-Modified-Since': http_date(last_modified)})
+    assert response.status_code == 304
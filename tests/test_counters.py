@@ -0,0 +1,38 @@
+import threading
+from datetime import datetime
+
+from counters import refresh_show_counts
+from models import db, Artist, Show, Venue
+
+
+def test_concurrent_show_creates_are_both_counted(app, session):
+    venue = Venue(name='The Musical Hop', city='San Francisco', state='CA', genres=['Jazz'])
+    artist = Artist(name='Guns N Petals', city='San Francisco', state='CA', genres=['Rock_n_Roll'])
+    session.add_all([venue, artist])
+    session.commit()
+    venue_id, artist_id = venue.id, artist.id
+
+    def create_show(session, hour):
+        session.add(Show(venue_id=venue_id, artist_id=artist_id,
+                         start_time=datetime(2030, 5, 21, hour)))
+        session.flush()
+        refresh_show_counts(venue_ids=[venue_id], artist_ids=[artist_id])
+
+    def other_request():
+        # a thread gets its own scoped session, so its own connection
+        with app.app_context():
+            create_show(db.session, 22)
+            db.session.commit()
+            db.session.remove()
+
+    create_show(session, 21)
+    other = threading.Thread(target=other_request)
+    other.start()
+    # the other transaction now waits for the rows this one refreshed
+    other.join(0.5)
+    session.commit()
+    other.join()
+
+    session.expire_all()
+    assert session.query(Venue.upcoming_shows_count).filter_by(id=venue_id).scalar() == 2
+    assert session.query(Artist.upcoming_shows_count).filter_by(id=artist_id).scalar() == 2
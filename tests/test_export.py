@@ -0,0 +1,30 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from models import Artist, Show, Venue
+
+
+@pytest.mark.parametrize('window', [
+    'from=2030-05-22',
+    'to=2030-05-22',
+    'from=2030-05-22T12:00&to=2030-05-23T21:00',
+])
+def test_export_window_matches_the_listing(app, session, window):
+    venue = Venue(name='The Musical Hop', city='San Francisco', state='CA', genres=['Jazz'])
+    artist = Artist(name='Guns N Petals', city='San Francisco', state='CA', genres=['Rock_n_Roll'])
+    session.add_all([venue, artist])
+    session.flush()
+    for day in (21, 22, 23, 24):
+        session.add(Show(venue_id=venue.id, artist_id=artist.id, start_time=datetime(2030, 5, day, 21)))
+    session.commit()
+
+    client = app.test_client()
+    listed = [show['id'] for show in json.loads(client.get('/api/v1/shows?' + window).get_data())['data']]
+    exported = [int(row['id']) for row in
+                csv.DictReader(io.StringIO(client.get('/shows/export?' + window).get_data(as_text=True)))]
+    assert exported == listed
+    assert 0 < len(listed) < 4
@@ -0,0 +1,33 @@
+from models import Venue
+import queries
+
+
+def _venue(session, genres):
+    session.add(Venue(name='The Musical Hop', city='San Francisco', state='CA', genres=genres))
+    session.commit()
+
+
+def _facet_counts(app):
+    with app.test_request_context('/venues'):
+        return {facet['genre']: facet['count'] for facet in queries.venue_genre_facets()}
+
+
+def test_facets_are_counted_once_per_listing_version(app, session, statements):
+    queries.facet_cache.clear()
+    _venue(session, ['Jazz'])
+    _venue(session, ['Jazz', 'Blues'])
+    client = app.test_client()
+
+    def unnests(path):
+        del statements[:]
+        assert client.get(path).status_code == 200
+        return len([statement for statement in statements if 'unnest' in statement])
+
+    assert unnests('/venues') == 1
+    assert unnests('/venues') == 0
+    assert unnests('/venues?genre=Jazz') == 1
+    assert _facet_counts(app) == {'Jazz': 2, 'Blues': 1}
+
+    _venue(session, ['Blues'])
+    assert unnests('/venues') == 1
+    assert _facet_counts(app) == {'Jazz': 2, 'Blues': 2}
@@ -0,0 +1,27 @@
+import pytest
+from flask import g
+from sqlalchemy import exc
+
+from instrumentation import _start_request
+
+
+def _state(connection):
+    return {key: repr(value) for key, value in connection.info.items()}
+
+
+def test_failed_statement_leaves_no_timing_behind(app, session):
+    with app.test_request_context('/'):
+        _start_request()
+        connection = session.connection()
+        connection.execute('SELECT 1')
+        before = _state(connection)
+
+        with pytest.raises(exc.DataError):
+            connection.execute('SELECT 1 / 0')
+        session.rollback()
+        assert _state(session.connection()) == before
+
+        session.execute('SELECT 2')
+        statements = [statement for _, statement in g.sql_statements]
+        assert statements == ['SELECT 1', 'SELECT 2']
+        assert all(elapsed >= 0 for elapsed, _ in g.sql_statements)
@@ -0,0 +1,45 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from models import Artist, Show, Venue
+from pagination import encode_cursor
+
+
+def _show(session):
+    venue = Venue(name='The Musical Hop', city='San Francisco', state='CA', genres=['Jazz'])
+    artist = Artist(name='Guns N Petals', city='San Francisco', state='CA', genres=['Rock_n_Roll'])
+    session.add_all([venue, artist])
+    session.flush()
+    session.add(Show(venue_id=venue.id, artist_id=artist.id, start_time=datetime(2030, 5, 21, 21)))
+    session.commit()
+
+
+# sort keys of the right length whose values the columns cannot take
+CRAFTED = [
+    ['tomorrow', 1],
+    [{'start_time': 1}, None],
+    ['2030-05-21 21:00:00', '1'],
+    ['2030-05-21 21:00:00', True],
+    [20300521, 1],
+]
+
+
+@pytest.mark.parametrize('cursor', CRAFTED)
+def test_crafted_cursor_reads_the_first_page(app, session, cursor):
+    _show(session)
+    client = app.test_client()
+    response = client.get('/api/v1/shows?limit=10&after=' + encode_cursor(cursor))
+    assert response.status_code == 200
+    assert len(json.loads(response.get_data())['data']) == 1
+
+    assert client.get('/shows?after=' + encode_cursor(cursor)).status_code == 200
+    assert client.get('/shows?before=' + encode_cursor(cursor)).status_code == 200
+
+
+@pytest.mark.parametrize('cursor', [['\x00', '', 1], ['CA', 'San Francisco', 'x']])
+def test_crafted_venue_cursor_reads_the_first_page(app, session, cursor):
+    _show(session)
+    response = app.test_client().get('/api/v1/venues?after=' + encode_cursor(cursor))
+    assert len(json.loads(response.get_data())['data']) == 1
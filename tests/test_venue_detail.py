@@ -0,0 +1,51 @@
+import re
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import exc
+
+from models import Artist, Show, Venue
+from queries import venue_detail
+
+_TABLE = re.compile(r'\b(?:FROM|JOIN)\s+(\w+)', re.IGNORECASE)
+
+
+def _venue_with_shows(session):
+    venue = Venue(name='The Musical Hop', city='San Francisco', state='CA', genres=['Jazz'])
+    artists = [Artist(name='Artist {}'.format(number), genres=['Jazz']) for number in range(3)]
+    session.add(venue)
+    session.add_all(artists)
+    session.flush()
+    now = datetime.now()
+    session.add_all([Show(venue_id=venue.id, artist_id=artist.id, start_time=now + timedelta(days=days))
+                     for artist in artists for days in (-30, 30)])
+    session.commit()
+    session.expire_all()
+    return venue.id
+
+
+def test_venue_load_joins_each_table_once(session, statements):
+    venue_id = _venue_with_shows(session)
+    del statements[:]
+
+    venue = venue_detail(venue_id)
+
+    assert venue['past_shows_count'] == 3 and venue['upcoming_shows_count'] == 3
+    assert len(statements) == 2
+    for statement in statements:
+        tables = Counter(_TABLE.findall(statement))
+        assert max(tables.values()) == 1, statement
+
+
+@pytest.mark.parametrize('model, relationship', [
+    (Venue, 'shows'),
+    (Artist, 'shows'),
+    (Show, 'venue'),
+    (Show, 'artist'),
+])
+def test_relationships_are_never_loaded_implicitly(session, model, relationship):
+    _venue_with_shows(session)
+    row = model.query.first()
+    with pytest.raises(exc.InvalidRequestError):
+        getattr(row, relationship)
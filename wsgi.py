@@ -0,0 +1,15 @@
+"""Entry point for a production WSGI server. With gunicorn, which reads
+its settings from gunicorn.conf.py:
+
+    gunicorn wsgi:app
+    WSGI_WORKER_CLASS=gthread gunicorn wsgi:app
+    WSGI_WORKER_CLASS=gevent gunicorn wsgi:app
+"""
+import os
+
+# debug mode stays off unless asked for
+os.environ.setdefault('DEBUG', '0')
+
+from app import create_app
+
+app = create_app()